@@ -0,0 +1,13 @@
+import settings
+from cache import TTLCache
+
+# Authenticated principals keyed by token subject (the user's email).
+# The cache lives in the worker process, so writes made through another
+# worker are only picked up once the entry expires.
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL
+)
+
+
+def invalidate_principal(user_id: int) -> None:
+    principal_cache.discard_if(lambda principal: principal.user_id == user_id)
@@ -7,15 +7,17 @@ from sqlalchemy.ext.asyncio import AsyncSession
 import settings
 from api.actions.authenticate.models import Token
 from api.actions.authenticate.optional import authenticate_user,\
-    get_current_user_from_token
-from db.models import User
+    get_current_user_with_posts
+from api.actions.users.models import ShowUser
 from db.session import get_db
+from query_budget import query_budget
 from security import create_access_token
 
 login_router = APIRouter()
 
 
 @login_router.post('/token', response_model=Token)
+@query_budget(2)
 async def login_for_access_token(
         form_data: OAuth2PasswordRequestForm = Depends(),
         db: AsyncSession = Depends(get_db)
@@ -38,5 +40,5 @@ async def login_for_access_token(
 
 
 @login_router.get('/auth_endpoint')
-async def sample_endpoint_under_jwt(current_user: User = Depends(get_current_user_from_token)):
+async def sample_endpoint_under_jwt(current_user: ShowUser = Depends(get_current_user_with_posts)):
     return {'success': True, 'current_user': current_user}
@@ -1,6 +1,14 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, EmailStr
 
 
 class Token(BaseModel):
     access_token: str
-    type_token: str
\ No newline at end of file
+    type_token: str
+
+
+class CurrentUser(BaseModel):
+    """Authenticated principal, carries no post data"""
+
+    user_id: int
+    email: EmailStr
+    is_active: bool
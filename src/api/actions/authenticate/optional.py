@@ -5,9 +5,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 import settings
+from api.actions.authenticate.cache import principal_cache
+from api.actions.authenticate.models import CurrentUser
 from api.actions.users.hashing import Hasher
 from api.actions.users.models import ShowUser
-from api.actions.users.optional import _get_all_post
+from api.actions.users.optional import _get_all_post, _get_user_by_id, \
+    _update_user
 from db.dal import UserDAL
 from db.models import User
 from db.session import get_db
@@ -16,26 +19,34 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl='login/token')
 
 
 async def _get_user_by_email(email: str, db: AsyncSession) -> User | None:
-    async with db as session:
-        async with session.begin():
-            user_dal = UserDAL(session)
-            return await user_dal.get_user_by_email(
-                email=email
-            )
+    user_dal = UserDAL(db)
+    return await user_dal.get_user_by_email(
+        email=email
+    )
 
 
 async def authenticate_user(email: str, password: str, db: AsyncSession) -> User | None:
     user = await _get_user_by_email(email, db)
+    if user is not None:
+        db.expunge(user)
+    # give the connection back to the pool before queueing for the hasher;
+    # a rehash below writes in a short transaction of its own
+    await db.rollback()
     if user is None:
         return
-    if not Hasher.verify_password(password, user.hashed_password):
+    verified, new_hash = await Hasher.verify_and_update_async(
+        password, user.hashed_password
+    )
+    if not verified:
         return
+    if new_hash is not None:
+        await _update_user({'hashed_password': new_hash}, user.id, db)
     return user
 
 
 async def get_current_user_from_token(
         token: str = Depends(oauth2_scheme),
-        db: AsyncSession = Depends(get_db)) -> ShowUser | None:
+        db: AsyncSession = Depends(get_db)) -> CurrentUser | None:
 
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -50,15 +61,31 @@ async def get_current_user_from_token(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+    current_user = principal_cache.get(email)
+    if current_user is not None:
+        return current_user
     user = await _get_user_by_email(email, db)
-    posts = await _get_all_post(user.id, db)
     if user is None:
         raise credentials_exception
-    return ShowUser(
+    current_user = CurrentUser(
         user_id=user.id,
-        name=user.name,
-        surname=user.surname,
         email=user.email,
-        is_active=user.is_active,
-        posts=posts
+        is_active=user.is_active
     )
+    principal_cache.set(email, current_user)
+    return current_user
+
+
+async def get_current_user_with_posts(
+        current_user: CurrentUser = Depends(get_current_user_from_token),
+        db: AsyncSession = Depends(get_db)) -> ShowUser:
+    """Full profile of the authenticated user, including all their posts"""
+
+    posts = await _get_all_post(current_user.user_id, db)
+    user = await _get_user_by_id(current_user.user_id, db, posts)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='Could not validate credentials'
+        )
+    return user
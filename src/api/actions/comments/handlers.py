@@ -1,17 +1,19 @@
 from logging import getLogger
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from api.actions.posts.handlers import get_post_by_id
-from api.actions.users.handlers import get_user_by_id
+import settings
+from api.actions.posts.optional import _get_post_by_id
+from api.actions.users.optional import _get_user_by_id, _get_all_post
+from api.actions.authenticate.models import CurrentUser
 from api.actions.authenticate.optional import get_current_user_from_token
-from api.actions.comments.models import CommentShow, CommentCreate
+from api.actions.comments.models import CommentShow, CommentCreate, CommentPage
 from api.actions.comments.optional import _create_new_comment,\
-    _get_comment_by_id, _get_post_id_by_comment
-from api.actions.users.models import ShowUser
+    _get_comment_by_id, _get_comments_page
 from db.session import get_db
+from query_budget import query_budget
 
 logger = getLogger(__name__)
 
@@ -19,14 +21,20 @@ comment_router = APIRouter()
 
 
 @comment_router.post('/', response_model=CommentShow)
+@query_budget(5)
 async def create_new_comment(
         body: CommentCreate,
         db: AsyncSession = Depends(get_db),
-        current_user: ShowUser = Depends(get_current_user_from_token)
+        current_user: CurrentUser = Depends(get_current_user_from_token)
 ) -> CommentShow:
     try:
-        user = await get_user_by_id(current_user.user_id, db)
-        post = await get_post_by_id(body.post_id, db)
+        posts = await _get_all_post(current_user.user_id, db)
+        user = await _get_user_by_id(current_user.user_id, db, posts)
+        post = await _get_post_by_id(body.post_id, db)
+        if post is None:
+            raise HTTPException(
+                status_code=404, detail=f'Post with id {body.post_id} not found'
+            )
         return await _create_new_comment(
             body, db, current_user.user_id, user, post
         )
@@ -37,19 +45,14 @@ async def create_new_comment(
 
 
 @comment_router.get('/', response_model=CommentShow)
+@query_budget(2)
 async def get_comment_by_id(
         comment_id: int,
         db: AsyncSession = Depends(get_db),
-        current_user: ShowUser = Depends(get_current_user_from_token)
+        current_user: CurrentUser = Depends(get_current_user_from_token)
 ) -> CommentShow:
     try:
-        user = await get_user_by_id(current_user.user_id, db)
-        post_id = await _get_post_id_by_comment(comment_id, db)
-        post = await get_post_by_id(post_id, db)
-
-        get_comment = await _get_comment_by_id(
-            comment_id, db, user, post
-        )
+        get_comment = await _get_comment_by_id(comment_id, db)
 
         if get_comment is None:
             raise HTTPException(
@@ -62,3 +65,15 @@ async def get_comment_by_id(
         logger.error(err)
         HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                       detail=f'Database error {err}')
+
+
+@comment_router.get('/by_post', response_model=CommentPage)
+@query_budget(2)
+async def get_comments_by_post(
+        post_id: int,
+        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+        cursor: str | None = None,
+        db: AsyncSession = Depends(get_db),
+        current_user: CurrentUser = Depends(get_current_user_from_token)
+) -> CommentPage:
+    return await _get_comments_page(post_id, db, limit, cursor)
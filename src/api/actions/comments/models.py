@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -22,3 +24,15 @@ class CommentShow(TunedModel):
     created: datetime
     body: str
     user: dict
+
+
+class CommentListItem(TunedModel):
+    comment_id: int
+    created: datetime
+    body: str
+    user: dict
+
+
+class CommentPage(BaseModel):
+    items: List[CommentListItem]
+    next_cursor: Optional[str]
@@ -1,54 +1,86 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.actions.comments.models import CommentCreate, CommentShow
-from api.actions.posts.models import ShowPost
-from api.actions.users.models import ShowUser
+from api.actions.comments.models import CommentCreate, CommentShow, \
+    CommentListItem, CommentPage
+from api.actions.posts.models import ShowPost, ShowPostID
+from api.actions.users.models import ShowUser, ShowUserProfile
 from db.dal import CommentsDAL
+from pagination import decode_cursor, encode_cursor
 
 
 async def _create_new_comment(body: CommentCreate, db: AsyncSession,
                               current_user: int,
                               data_current_user: ShowUser,
                               data_current_post: ShowPost) -> CommentShow:
-    async with db as session:
-        async with session.begin():
-            comment_dal = CommentsDAL(session)
-            comment = await comment_dal.create_comment(
-                post_id=body.post_id,
-                body=body.body,
-                user_id=current_user
-            )
-            return CommentShow(
-                post=data_current_post,
-                created=comment.created,
-                body=comment.body,
-                user=data_current_user
-            )
-
-
-async def _get_post_id_by_comment(comment_id: int, db: AsyncSession) -> int:
-    async with db as session:
-        async with session.begin():
-            comment_dal = CommentsDAL(session)
-            id_post = await comment_dal.get_post_id_by_comment(comment_id)
-            return id_post
+    comment_dal = CommentsDAL(db)
+    comment = await comment_dal.create_comment(
+        post_id=body.post_id,
+        body=body.body,
+        user_id=current_user
+    )
+    await db.commit()
+    return CommentShow(
+        post=data_current_post,
+        created=comment.created,
+        body=comment.body,
+        user=data_current_user
+    )
 
 
 async def _get_comment_by_id(
-        comment_id: int, db: AsyncSession,
-        data_user_by_comment: ShowUser,
-        post: ShowPost
-) -> CommentShow:
-    async with db as session:
-        async with session.begin():
-            comment_dal = CommentsDAL(session)
-            get_comment = await comment_dal.get_comment_by_id(
-                comment_id=comment_id
+        comment_id: int, db: AsyncSession
+) -> CommentShow | None:
+    comment_dal = CommentsDAL(db)
+    comment_with_relations = await comment_dal.get_comment_with_post_and_author(
+        comment_id=comment_id
+    )
+    if comment_with_relations is not None:
+        get_comment, post, author = comment_with_relations
+        return CommentShow(
+            post=ShowPostID(
+                post_id=post.id,
+                title=post.title,
+                body=post.body,
+                created=post.created,
+                owner_id=post.owner_id
+            ),
+            created=get_comment.created,
+            body=get_comment.body,
+            user=ShowUserProfile(
+                user_id=author.id,
+                name=author.name,
+                surname=author.surname,
+                email=author.email,
+                is_active=author.is_active
             )
-            if get_comment is not None:
-                return CommentShow(
-                    post=post,
-                    created=get_comment.created,
-                    body=get_comment.body,
-                    user=data_user_by_comment
+        )
+
+
+async def _get_comments_page(post_id: int, db: AsyncSession,
+                             limit: int, cursor: str | None = None) -> CommentPage:
+    after = decode_cursor(cursor)
+    comment_dal = CommentsDAL(db)
+    comments = await comment_dal.get_comments_page_by_post_id(
+        post_id=post_id, limit=limit + 1, after=after
+    )
+    next_cursor = None
+    if len(comments) > limit:
+        comments = comments[:limit]
+        last_comment = comments[-1][0]
+        next_cursor = encode_cursor(last_comment.created, last_comment.id)
+    return CommentPage(
+        items=[
+            CommentListItem(
+                comment_id=comment.id,
+                created=comment.created,
+                body=comment.body,
+                user=ShowUserProfile(
+                    user_id=author.id,
+                    name=author.name,
+                    surname=author.surname,
+                    email=author.email,
+                    is_active=author.is_active
                 )
+            ) for comment, author in comments],
+        next_cursor=next_cursor
+    )
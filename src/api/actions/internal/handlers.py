@@ -0,0 +1,54 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+import metrics
+from api.actions.authenticate.cache import principal_cache
+from api.actions.users.hashing import hashing_pool
+from db.session import engine, replica_engines
+from feed import latest_posts
+from response_cache import response_cache
+from single_flight import single_flight
+
+internal_router = APIRouter()
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get('/metrics', response_class=PlainTextResponse)
+async def prometheus_metrics() -> str:
+    return metrics.render()
+
+
+@internal_router.get('/principal_cache')
+async def principal_cache_stats() -> dict:
+    return principal_cache.stats()
+
+
+@internal_router.get('/hasher')
+async def hasher_stats() -> dict:
+    return hashing_pool.stats()
+
+
+@internal_router.get('/pool')
+async def pool_stats() -> dict:
+    return engine.sync_engine.pool.stats()
+
+
+@internal_router.get('/replica_pools')
+async def replica_pool_stats() -> list:
+    return [replica_engine.sync_engine.pool.stats() for replica_engine in replica_engines]
+
+
+@internal_router.get('/response_cache')
+async def response_cache_stats() -> dict:
+    return response_cache.stats()
+
+
+@internal_router.get('/single_flight')
+async def single_flight_stats() -> dict:
+    return single_flight.stats()
+
+
+@internal_router.get('/feed')
+async def feed_stats() -> dict:
+    return latest_posts.stats()
@@ -1,30 +1,39 @@
 from logging import getLogger
+from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
+import settings
+from api.actions.authenticate.models import CurrentUser
 from api.actions.authenticate.optional import get_current_user_from_token
-from api.actions.posts.models import ShowPost, PostCreate, \
-    DeletePostResponse, UpdatePostResponse, UpdatePostRequest
+from api.actions.posts.models import ShowPost, ShowPostID, PostCreate, \
+    DeletePostResponse, UpdatePostResponse, UpdatePostRequest, \
+    PostBulkCreate, BulkPostResponse, PostBatch, PostSearchPage, PostPage
 from api.actions.posts.optional import _create_new_post, \
-    _delete_post, _get_post_by_id, _update_post, _get_owner_id, _post_by_id
-from api.actions.users.handlers import get_user_by_id
-from api.actions.users.models import ShowUser
-from db.session import get_db
+    _delete_post, _get_post_with_etag, _get_post_etag, _update_post, \
+    _post_by_id, _create_new_posts, _get_posts_batch, _search_posts, _get_feed_page
+from db.session import get_db, replica_lag
+from http_cache import cache_headers, etag_matches
+from id_list import parse_ids
+from query_budget import query_budget
+from response_cache import response_cache, post_key, fill_token, store, \
+    pack, unpack
 
 logger = getLogger(__name__)
 
 post_route = APIRouter()
 
 
-@post_route.post('/', response_model=ShowPost)
+@post_route.post('/', response_model=ShowPostID)
+@query_budget(3)
 async def create_new_post(
         body: PostCreate,
         db: AsyncSession = Depends(get_db),
-        current_user: ShowUser = Depends(get_current_user_from_token)
-) -> ShowPost:
+        current_user: CurrentUser = Depends(get_current_user_from_token)
+) -> ShowPostID:
     try:
         return await _create_new_post(body, db, current_user.user_id)
     except IntegrityError as err:
@@ -32,18 +41,42 @@ async def create_new_post(
         HTTPException(status_code=503, detail=f'Database error {err}')
 
 
+@post_route.post('/bulk', response_model=BulkPostResponse)
+@query_budget(4)
+async def create_new_posts(
+        body: PostBulkCreate,
+        db: AsyncSession = Depends(get_db),
+        current_user: CurrentUser = Depends(get_current_user_from_token)
+) -> BulkPostResponse:
+    if len(body.items) > settings.BULK_POST_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f'At most {settings.BULK_POST_MAX_ITEMS} posts per request'
+        )
+    try:
+        return await _create_new_posts(body.items, db, current_user.user_id)
+    except IntegrityError as err:
+        logger.error(err)
+        raise HTTPException(status_code=503, detail=f'Database error {err}')
+
+
 @post_route.delete('/', response_model=DeletePostResponse)
+@query_budget(4)
 async def delete_post(
         post_id: int, db: AsyncSession = Depends(get_db),
-        current_user: ShowUser = Depends(get_current_user_from_token)
+        current_user: CurrentUser = Depends(get_current_user_from_token)
 ) -> DeletePostResponse:
     current_post = await _post_by_id(post_id, db)
+    if current_post is None:
+        raise HTTPException(
+            status_code=404, detail=f'Post with id {post_id} not found'
+        )
     if current_post.owner_id != current_user.user_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='You are not the author of this post and do not have permission to delete'
         )
-    post_deleted_id = await _delete_post(post_id, db)
+    post_deleted_id = await _delete_post(post_id, db, current_post.owner_id)
     if post_deleted_id is None:
         raise HTTPException(
             status_code=404, detail=f'Post with id {post_id} not found'
@@ -54,26 +87,77 @@ async def delete_post(
 
 
 @post_route.get('/', response_model=ShowPost)
+@query_budget(2)
 async def get_post_by_id(
-        post_id: int, db: AsyncSession = Depends(get_db)
+        post_id: int, request: Request, response: Response,
+        db: AsyncSession = Depends(get_db)
 ) -> ShowPost:
-    owner_id = await _get_owner_id(post_id, db)
-    owner = await get_user_by_id(owner_id, db)
-    get_post = await _get_post_by_id(post_id, db, owner)
-    if get_post is None:
+    if_none_match = request.headers.get('if-none-match')
+    cached = await response_cache.get(post_key(post_id))
+    if cached is not None:
+        etag, payload = unpack(cached)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
+        return Response(content=payload, media_type='application/json',
+                        headers=cache_headers(etag))
+    if if_none_match:
+        etag = await _get_post_etag(post_id, db)
+        if etag is not None and etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
+    token = fill_token()
+    post_with_etag = await _get_post_with_etag(post_id, db)
+    if post_with_etag is None:
         raise HTTPException(
             status_code=404, detail=f'Post with id {post_id} not found'
         )
+    get_post, etag = post_with_etag
+    response.headers.update(cache_headers(etag))
+    await store(post_key(post_id), pack(etag, get_post.json().encode()),
+                get_post.owner['user_id'], token, replica_lag(db))
     return get_post
 
 
+@post_route.get('/batch', response_model=PostBatch)
+@query_budget(1)
+async def get_posts_batch(
+        ids: List[str] = Query(...), db: AsyncSession = Depends(get_db)
+) -> PostBatch:
+    return await _get_posts_batch(parse_ids(ids), db)
+
+
+@post_route.get('/feed', response_model=PostPage)
+@query_budget(1)
+async def get_feed(
+        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+        cursor: str | None = None,
+        db: AsyncSession = Depends(get_db)
+) -> PostPage:
+    return await _get_feed_page(db, limit, cursor)
+
+
+@post_route.get('/search', response_model=PostSearchPage)
+@query_budget(1)
+async def search_posts(
+        q: str = Query(..., min_length=1, max_length=settings.SEARCH_QUERY_MAX_LENGTH),
+        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+        cursor: str | None = None,
+        db: AsyncSession = Depends(get_db)
+) -> PostSearchPage:
+    return await _search_posts(q, db, limit, cursor)
+
+
 @post_route.patch('/', response_model=UpdatePostResponse)
+@query_budget(4)
 async def update_post(
         post_id: int, body: UpdatePostRequest,
         db: AsyncSession = Depends(get_db),
-        current_user: ShowUser = Depends(get_current_user_from_token)
+        current_user: CurrentUser = Depends(get_current_user_from_token)
 ) -> UpdatePostResponse:
     current_post = await _post_by_id(post_id, db)
+    if current_post is None:
+        raise HTTPException(
+            status_code=404, detail=f'Post with id {post_id} not found'
+        )
     if current_post.owner_id != current_user.user_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -87,12 +171,9 @@ async def update_post(
             detail='At least one parameter for users update '
                    'info should be provided'
         )
-    post = await _post_by_id(post_id, db)
-    if post is None:
-        raise HTTPException(
-            status_code=404, detail=f'Post with id {post_id} not found'
-        )
-    updated_post = await _update_post(updated_post_params, post_id, db)
+    updated_post = await _update_post(
+        updated_post_params, post_id, db, current_post.owner_id
+    )
     return UpdatePostResponse(
         updated_post_id=updated_post,
         updated_data=body.dict()
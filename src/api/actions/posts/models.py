@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import BaseModel, constr
+from pydantic import BaseModel, constr, conlist
 
 
 # BLOCK WITH API MODELS
@@ -30,11 +30,52 @@ class ShowPostID(TunedModel):
     owner_id: int
 
 
+class PostPage(BaseModel):
+    items: List[ShowPostID]
+    next_cursor: Optional[str]
+
+
+class PostSearchHit(ShowPostID):
+    rank: float
+    snippet: str
+
+
+class PostSearchPage(BaseModel):
+    items: List[PostSearchHit]
+    next_cursor: Optional[str]
+
+
+class PostBatchItem(BaseModel):
+    post_id: int
+    found: bool
+    post: Optional[ShowPostID]
+
+
+class PostBatch(BaseModel):
+    items: List[PostBatchItem]
+
+
 class PostCreate(BaseModel):
     title: str
     body: str
 
 
+class PostBulkCreate(BaseModel):
+    items: conlist(PostCreate, min_items=1)
+
+
+class BulkPostResult(BaseModel):
+    index: int
+    post_id: Optional[int]
+    created: Optional[datetime]
+    error: Optional[str]
+
+
+class BulkPostResponse(BaseModel):
+    created_count: int
+    results: List[BulkPostResult]
+
+
 class DeletePostResponse(BaseModel):
     post_deleted_id: int
     status: str
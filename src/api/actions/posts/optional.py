@@ -1,87 +1,245 @@
+import html
+from datetime import datetime
+from typing import List, Tuple
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.actions.posts.models import PostCreate, ShowPost, ShowPostID
+from api.actions.posts.models import PostCreate, ShowPost, ShowPostID, PostPage, \
+    BulkPostResponse, BulkPostResult, PostBatch, PostBatchItem, \
+    PostSearchHit, PostSearchPage
 from api.actions.users.models import ShowUser
 from db.dal import PostDAL
+from feed import latest_posts
+from http_cache import make_etag
+from pagination import decode_rank_cursor, encode_rank_cursor, decode_cursor, \
+    encode_cursor
+from response_cache import invalidate_owner
+from single_flight import coalesce
+
+# ts_headline marks matches with control characters, the snippet is HTML
+# escaped before they become <mark> tags
+_MATCH_START, _MATCH_STOP = '\x02', '\x03'
+HEADLINE_OPTIONS = (
+    f'StartSel={_MATCH_START}, StopSel={_MATCH_STOP}, '
+    'MaxWords=35, MinWords=15, MaxFragments=2'
+)
 
 
 async def _create_new_post(body: PostCreate, db: AsyncSession,
-                           current_user: int) -> ShowPost:
-    async with db as session:
-        async with session.begin():
-            post_dal = PostDAL(session)
-            post = await post_dal.create_post(
-                title=body.title,
-                body=body.body,
+                           current_user: int) -> ShowPostID:
+    post_dal = PostDAL(db)
+    post = await post_dal.create_post(
+        title=body.title,
+        body=body.body,
+        owner_id=current_user
+    )
+    await db.commit()
+    await invalidate_owner(current_user)
+    show_post = ShowPostID(
+        post_id=post.id,
+        title=post.title,
+        body=post.body,
+        created=post.created,
+        owner_id=post.owner_id
+    )
+    latest_posts.add(show_post)
+    return show_post
+
+
+async def _create_new_posts(items: List[PostCreate], db: AsyncSession,
+                            current_user: int) -> BulkPostResponse:
+    results = [
+        BulkPostResult(index=index, error='title and body must not be empty')
+        for index, item in enumerate(items)
+        if not item.title.strip() or not item.body.strip()
+    ]
+    rejected = {result.index for result in results}
+    accepted = [index for index in range(len(items)) if index not in rejected]
+    if accepted:
+        post_dal = PostDAL(db)
+        created_posts = await post_dal.create_posts(
+            owner_id=current_user,
+            posts=[items[index].dict() for index in accepted]
+        )
+        await db.commit()
+        await invalidate_owner(current_user)
+        latest_posts.add_many(
+            ShowPostID(
+                post_id=post_id,
+                title=items[index].title,
+                body=items[index].body,
+                created=created,
                 owner_id=current_user
+            ) for index, (post_id, created) in zip(accepted, created_posts)
+        )
+        results.extend(
+            BulkPostResult(index=index, post_id=post_id, created=created)
+            for index, (post_id, created) in zip(accepted, created_posts)
+        )
+    results.sort(key=lambda result: result.index)
+    return BulkPostResponse(created_count=len(accepted), results=results)
+
+
+async def _delete_post(post_id: int, db: AsyncSession, owner_id: int) -> int | None:
+    post_dal = PostDAL(db)
+    delete_post = await post_dal.delete_post(
+        post_id=post_id
+    )
+    await db.commit()
+    if delete_post is not None:
+        await invalidate_owner(owner_id)
+        latest_posts.discard(delete_post)
+    return delete_post
+
+
+def _post_etag(post_id: int, post_version: int, owner_version: int) -> str:
+    return make_etag('p', post_id, post_version, owner_version)
+
+
+async def _get_post_etag(post_id: int, db: AsyncSession) -> str | None:
+    post_dal = PostDAL(db)
+    versions = await post_dal.get_post_versions(post_id=post_id)
+    if versions is not None:
+        return _post_etag(post_id, *versions)
+
+
+@coalesce
+async def _get_post_with_etag(post_id: int, db: AsyncSession) -> Tuple[ShowPost, str] | None:
+    post_dal = PostDAL(db)
+    post_with_owner = await post_dal.get_post_with_owner(
+        post_id=post_id
+    )
+    if post_with_owner is not None:
+        get_post, owner, owner_posts = post_with_owner
+        show_post = ShowPost(
+            post_id=get_post.id,
+            title=get_post.title,
+            body=get_post.body,
+            created=get_post.created,
+            owner=ShowUser(
+                user_id=owner.id,
+                name=owner.name,
+                surname=owner.surname,
+                email=owner.email,
+                is_active=owner.is_active,
+                posts=[
+                    ShowPostID(
+                        post_id=post.id,
+                        title=post.title,
+                        body=post.body,
+                        created=post.created,
+                        owner_id=post.owner_id
+                    ) for post in owner_posts]
             )
-            return ShowPost(
+        )
+        return show_post, _post_etag(get_post.id, get_post.version, owner.version)
+
+
+async def _get_post_by_id(post_id: int, db: AsyncSession) -> ShowPost | None:
+    post_with_etag = await _get_post_with_etag(post_id, db)
+    if post_with_etag is not None:
+        return post_with_etag[0]
+
+
+async def _post_by_id(post_id: int, db: AsyncSession) -> ShowPostID | None:
+    post_dal = PostDAL(db)
+    get_post = await post_dal.get_post_by_id(
+        post_id=post_id
+    )
+    if get_post is not None:
+        return ShowPostID(
+            post_id=get_post.id,
+            title=get_post.title,
+            body=get_post.body,
+            created=get_post.created,
+            owner_id=get_post.owner_id
+        )
+
+
+async def _get_posts_batch(post_ids: List[int], db: AsyncSession) -> PostBatch:
+    post_dal = PostDAL(db)
+    posts = await post_dal.get_posts_by_ids(post_ids)
+    return PostBatch(items=[
+        PostBatchItem(
+            post_id=post_id,
+            found=post is not None,
+            post=ShowPostID(
                 post_id=post.id,
                 title=post.title,
                 body=post.body,
                 created=post.created,
                 owner_id=post.owner_id
-            )
+            ) if post is not None else None
+        ) for post_id, post in zip(post_ids, posts)])
 
 
-async def _delete_post(post_id: int, db: AsyncSession) -> int | None:
-    async with db as session:
-        async with session.begin():
-            post_dal = PostDAL(session)
-            delete_post = await post_dal.delete_post(
-                post_id=post_id
-            )
-            return delete_post
+async def _load_latest_posts(db: AsyncSession, limit: int,
+                             after: Tuple[datetime, int] | None = None) -> List[ShowPostID]:
+    post_dal = PostDAL(db)
+    posts = await post_dal.get_latest_posts(limit=limit, after=after)
+    return [
+        ShowPostID(
+            post_id=post.id,
+            title=post.title,
+            body=post.body,
+            created=post.created,
+            owner_id=post.owner_id
+        ) for post in posts]
 
 
-async def _get_post_by_id(post_id: int, db: AsyncSession,
-                          owner: ShowUser) -> ShowPost | None:
-    async with db as session:
-        async with session.begin():
-            post_dal = PostDAL(session)
-            get_post = await post_dal.get_post_by_id(
-                post_id=post_id
-            )
-            if get_post is not None:
-                return ShowPost(
-                    post_id=get_post.id,
-                    title=get_post.title,
-                    body=get_post.body,
-                    created=get_post.created,
-                    owner=owner
-                )
+async def _get_feed_page(db: AsyncSession, limit: int,
+                         cursor: str | None = None) -> PostPage:
+    after = decode_cursor(cursor)
+    posts = latest_posts.page(limit, after)
+    if posts is None:
+        posts = await _load_latest_posts(db, limit + 1, after)
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor(posts[-1].created, posts[-1].post_id)
+    return PostPage(items=posts, next_cursor=next_cursor)
 
 
-async def _post_by_id(post_id: int, db: AsyncSession) -> ShowPostID | None:
-    async with db as session:
-        async with session.begin():
-            post_dal = PostDAL(session)
-            get_post = await post_dal.get_post_by_id(
-                post_id=post_id
-            )
-            if get_post is not None:
-                return ShowPostID(
-                    post_id=get_post.id,
-                    title=get_post.title,
-                    body=get_post.body,
-                    created=get_post.created,
-                    owner_id=get_post.owner_id
-                )
-
-
-async def _get_owner_id(post_id: int, db: AsyncSession) -> int | None:
-    async with db as session:
-        async with session.begin():
-            post_dal = PostDAL(session)
-            return await post_dal.get_owner_id(post_id=post_id)
-
-
-async def _update_post(updated_params: dict, post_id: int, db: AsyncSession) -> int | None:
-    async with db as session:
-        async with session.begin():
-            post_dal = PostDAL(session)
-            updated_post = await post_dal.update_post(
-                post_id,
-                **updated_params
-            )
-            return updated_post
\ No newline at end of file
+def _highlight(headline: str) -> str:
+    return html.escape(headline).replace(_MATCH_START, '<mark>').replace(_MATCH_STOP, '</mark>')
+
+
+async def _search_posts(text: str, db: AsyncSession, limit: int,
+                        cursor: str | None = None) -> PostSearchPage:
+    after = decode_rank_cursor(cursor)
+    post_dal = PostDAL(db)
+    hits = await post_dal.search(
+        text, limit=limit + 1, headline_options=HEADLINE_OPTIONS, after=after
+    )
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        last_post, last_rank, _ = hits[-1]
+        next_cursor = encode_rank_cursor(last_rank, last_post.id)
+    return PostSearchPage(
+        items=[
+            PostSearchHit(
+                post_id=post.id,
+                title=post.title,
+                body=post.body,
+                created=post.created,
+                owner_id=post.owner_id,
+                rank=rank,
+                snippet=_highlight(headline)
+            ) for post, rank, headline in hits],
+        next_cursor=next_cursor
+    )
+
+
+async def _update_post(updated_params: dict, post_id: int,
+                       db: AsyncSession, owner_id: int) -> int | None:
+    post_dal = PostDAL(db)
+    updated_post = await post_dal.update_post(
+        post_id,
+        **updated_params
+    )
+    await db.commit()
+    if updated_post is not None:
+        await invalidate_owner(owner_id)
+        latest_posts.update(updated_post, **updated_params)
+    return updated_post
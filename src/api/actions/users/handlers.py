@@ -1,16 +1,27 @@
 from logging import getLogger
+from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
 
+import settings
+from api.actions.posts.models import PostPage
 from api.actions.users.models import UserCreate, ShowUser, \
-    DeleteUserResponse, UpdateUserRequest, UpdateUserResponse
+    DeleteUserResponse, UpdateUserRequest, UpdateUserResponse, ShowUserProfile, \
+    UserBatch
 from api.actions.users.optional import _create_new_user, _delete_user,\
-    _get_user_by_id, _update_user, _get_all_post
+    _update_user, _get_user_profile, _get_posts_page, \
+    _get_user_etag, _get_user_with_etag, _get_users_batch
+from api.actions.authenticate.models import CurrentUser
 from api.actions.authenticate.optional import get_current_user_from_token
-from db.models import User
-from db.session import get_db
+from db.session import get_db, replica_lag
+from http_cache import cache_headers, etag_matches
+from id_list import parse_ids
+from query_budget import query_budget
+from response_cache import response_cache, user_key, fill_token, store, \
+    pack, unpack
 
 logger = getLogger(__name__)
 
@@ -18,6 +29,7 @@ user_route = APIRouter()
 
 
 @user_route.post('/', response_model=ShowUser)
+@query_budget(1)
 async def create_new_user(
         body: UserCreate, db: AsyncSession = Depends(get_db)
 ) -> ShowUser:
@@ -29,8 +41,9 @@ async def create_new_user(
 
 
 @user_route.delete('/', response_model=DeleteUserResponse)
+@query_budget(2)
 async def delete_user(
-        current_user: User = Depends(get_current_user_from_token),
+        current_user: CurrentUser = Depends(get_current_user_from_token),
         db: AsyncSession = Depends(get_db)) -> DeleteUserResponse:
     deleted_user_id = await _delete_user(current_user.user_id, db)
     if deleted_user_id is None:
@@ -41,11 +54,42 @@ async def delete_user(
 
 
 @user_route.get('/', response_model=ShowUser)
+@query_budget(3)
 async def get_user_by_id(
-        user_id: int, db: AsyncSession = Depends(get_db)
+        user_id: int, request: Request, response: Response,
+        db: AsyncSession = Depends(get_db)
 ) -> ShowUser:
-    posts = await _get_all_post(user_id, db)
-    get_user = await _get_user_by_id(user_id, db, posts)
+    if_none_match = request.headers.get('if-none-match')
+    cached = await response_cache.get(user_key(user_id))
+    if cached is not None:
+        etag, payload = unpack(cached)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
+        return Response(content=payload, media_type='application/json',
+                        headers=cache_headers(etag))
+    if if_none_match:
+        etag = await _get_user_etag(user_id, db)
+        if etag is not None and etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
+    token = fill_token()
+    user_with_etag = await _get_user_with_etag(user_id, db)
+    if user_with_etag is None:
+        raise HTTPException(
+            status_code=404, detail=f'User with id {user_id} not found'
+        )
+    get_user, etag = user_with_etag
+    response.headers.update(cache_headers(etag))
+    await store(user_key(user_id), pack(etag, get_user.json().encode()), user_id, token,
+                replica_lag(db))
+    return get_user
+
+
+@user_route.get('/profile', response_model=ShowUserProfile)
+@query_budget(1)
+async def get_user_profile(
+        user_id: int, db: AsyncSession = Depends(get_db)
+) -> ShowUserProfile:
+    get_user = await _get_user_profile(user_id, db)
     if get_user is None:
         raise HTTPException(
             status_code=404, detail=f'User with id {user_id} not found'
@@ -53,11 +97,31 @@ async def get_user_by_id(
     return get_user
 
 
+@user_route.get('/batch', response_model=UserBatch)
+@query_budget(1)
+async def get_users_batch(
+        ids: List[str] = Query(...), db: AsyncSession = Depends(get_db)
+) -> UserBatch:
+    return await _get_users_batch(parse_ids(ids), db)
+
+
+@user_route.get('/posts', response_model=PostPage)
+@query_budget(1)
+async def get_user_posts(
+        user_id: int,
+        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+        cursor: str | None = None,
+        db: AsyncSession = Depends(get_db)
+) -> PostPage:
+    return await _get_posts_page(user_id, db, limit, cursor)
+
+
 @user_route.patch('/', response_model=UpdateUserResponse)
+@query_budget(2)
 async def update_user_by_id(
         body: UpdateUserRequest,
         db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user_from_token)) -> UpdateUserResponse:
+        current_user: CurrentUser = Depends(get_current_user_from_token)) -> UpdateUserResponse:
     updated_user_params = body.dict(exclude_none=True)
     if updated_user_params == {}:
         raise HTTPException(
@@ -65,12 +129,11 @@ async def update_user_by_id(
             detail='At least one parameter for users update '
                    'info should be provided'
         )
-    user = await _get_user_by_id(current_user.user_id, db)
-    if user is None:
+    updated_user = await _update_user(updated_user_params, current_user.user_id, db)
+    if updated_user is None:
         raise HTTPException(
-            status_code=404, detail=f'User with id {user} not found'
+            status_code=404, detail=f'User with id {current_user.user_id} not found'
         )
-    updated_user = await _update_user(updated_user_params, user.user_id, db)
     return UpdateUserResponse(
         updated_user_id=updated_user,
         updated_data=body.dict()
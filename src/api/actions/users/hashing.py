@@ -1,14 +1,160 @@
+import argparse
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
 from passlib.context import CryptContext
 
+import settings
+
 
 password_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 
 
+def configure_rounds(rounds: int) -> None:
+    """Hash with ``rounds`` and treat hashes of a lower cost as stale, so
+    they are replaced on the next successful login. Higher costs are kept,
+    a host pinned to a lower cost must not downgrade them."""
+
+    password_context.update(
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds
+    )
+
+
+def calibrate_rounds(target_ms: float, min_rounds: int = 4, max_rounds: int = 16) -> int:
+    """Lowest bcrypt cost whose hash takes at least ``target_ms`` on this host"""
+
+    bcrypt = password_context.handler('bcrypt')
+    for rounds in range(min_rounds, max_rounds + 1):
+        started = time.perf_counter()
+        bcrypt.using(rounds=rounds).hash('calibration')
+        if (time.perf_counter() - started) * 1000 >= target_ms:
+            return rounds
+    return max_rounds
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    return password_context.verify(plain_password, hashed_password)
+
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return password_context.verify_and_update(plain_password, hashed_password)
+
+
+def _get_password_hash(password: str) -> str:
+    return password_context.hash(password)
+
+
+class HashingPool:
+    """Runs bcrypt calls in a thread or process pool so they do not block
+    the event loop, with at most ``max_concurrency`` calls in flight."""
+
+    def __init__(self, workers: int, max_concurrency: int, use_processes: bool = False):
+        self.rounds: int | None = None
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self.use_processes = use_processes
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self._executor: Executor | None = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes and self.rounds is not None:
+                # worker processes do not see configure_rounds() calls made here
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=configure_rounds,
+                    initargs=(self.rounds,)
+                )
+            elif self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def run(self, func, *args):
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def set_rounds(self, rounds: int) -> None:
+        configure_rounds(rounds)
+        self.rounds = rounds
+        self.shutdown()
+
+    def stats(self) -> dict:
+        return {
+            'rounds': self.rounds,
+            'executor': 'process' if self.use_processes else 'thread',
+            'workers': self.workers,
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'completed': self.completed
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+hashing_pool = HashingPool(
+    workers=settings.HASHER_WORKERS,
+    max_concurrency=settings.HASHER_MAX_CONCURRENCY,
+    use_processes=settings.HASHER_EXECUTOR == 'process'
+)
+if settings.BCRYPT_ROUNDS is not None:
+    hashing_pool.set_rounds(settings.BCRYPT_ROUNDS)
+
+
 class Hasher:
     @staticmethod
     def verify_password(plain_password, hashed_password):
-        return password_context.verify(plain_password, hashed_password)
+        return _verify_password(plain_password, hashed_password)
 
     @staticmethod
     def get_password_hash(password: str) -> str:
-        return password_context.hash(password)
\ No newline at end of file
+        return _get_password_hash(password)
+
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        return await hashing_pool.run(_verify_password, plain_password, hashed_password)
+
+    @staticmethod
+    async def get_password_hash_async(password: str) -> str:
+        return await hashing_pool.run(_get_password_hash, password)
+
+    @staticmethod
+    async def verify_and_update_async(
+            plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        """Verify a password and return a new hash if the stored one uses
+        a stale cost or scheme"""
+
+        return await hashing_pool.run(_verify_and_update, plain_password, hashed_password)
+
+
+if __name__ == '__main__':
+    # run once on production hardware and pin the result for every worker,
+    # workers that calibrate on their own may disagree on the cost
+    parser = argparse.ArgumentParser(
+        description='Pick the bcrypt cost that reaches a target hash latency'
+    )
+    parser.add_argument('--target-ms', type=float, default=250)
+    args = parser.parse_args()
+    print(f'BCRYPT_ROUNDS={calibrate_rounds(args.target_ms)}')
@@ -0,0 +1,165 @@
+"""Stream users from an NDJSON or CSV file into the database.
+
+Rows are read lazily and handled in chunks. The passwords of a chunk are
+hashed in a process pool across all cores while the previous chunk is
+being inserted. Every chunk is one multi-row INSERT in its own
+transaction. Emails that already exist and invalid rows are reported
+instead of aborting the run. Run from the ``src`` directory::
+
+    python -m api.actions.users.importer users.ndjson --report rejected.ndjson
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+from typing import Iterator, List, TextIO
+
+from api.actions.users.hashing import HashingPool, _get_password_hash, hashing_pool
+from api.actions.users.models import UserCreate
+from db.dal import UserDAL
+from db.session import async_session, engine
+
+# a chunk's INSERT binds 5 parameters per user, asyncpg allows 32767 per statement
+MAX_CHUNK_SIZE = 32767 // 5
+
+
+class Rejections:
+    """Writes rejected rows to the report as they happen"""
+
+    def __init__(self, file: TextIO):
+        self.file = file
+        self.count = 0
+
+    def add(self, **entry) -> None:
+        self.count += 1
+        self.file.write(json.dumps(entry) + '\n')
+
+
+def read_rows(file: TextIO, file_format: str) -> Iterator[tuple]:
+    """Yield (row, error) pairs without loading the whole file"""
+
+    if file_format == 'csv':
+        for row in csv.DictReader(file):
+            yield row, None
+        return
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as err:
+            yield None, f'invalid JSON: {err}'
+            continue
+        if isinstance(row, dict):
+            yield row, None
+        else:
+            yield None, f'expected a JSON object, got {type(row).__name__}'
+
+
+def validated(rows: Iterator[tuple], rejected: Rejections) -> Iterator[UserCreate]:
+    for row_number, (row, error) in enumerate(rows, start=1):
+        if row is None:
+            rejected.add(row=row_number, error=error)
+            continue
+        try:
+            yield UserCreate(**row)
+        except Exception as err:
+            # UserCreate validators raise HTTPException rather than ValueError
+            rejected.add(
+                row=row_number, email=row.get('email'),
+                error=getattr(err, 'detail', None) or str(err)
+            )
+
+
+def chunked(users: Iterator[UserCreate], size: int,
+            rejected: Rejections) -> Iterator[List[UserCreate]]:
+    """Group users into chunks with no repeated email inside a chunk"""
+
+    chunk = {}
+    for user in users:
+        if user.email in chunk:
+            rejected.add(email=user.email, error='duplicate email in file')
+            continue
+        chunk[user.email] = user
+        if len(chunk) >= size:
+            yield list(chunk.values())
+            chunk = {}
+    if chunk:
+        yield list(chunk.values())
+
+
+async def hash_chunk(pool: HashingPool, chunk: List[UserCreate]) -> List[dict]:
+    hashed_passwords = await asyncio.gather(
+        *(pool.run(_get_password_hash, user.password) for user in chunk)
+    )
+    return [
+        dict(name=user.name, surname=user.surname, email=user.email,
+             is_active=True, hashed_password=hashed_password)
+        for user, hashed_password in zip(chunk, hashed_passwords)
+    ]
+
+
+async def insert_chunk(users: List[dict], rejected: Rejections) -> int:
+    async with async_session() as session:
+        async with session.begin():
+            inserted = set(await UserDAL(session).create_users(users))
+    for user in users:
+        if user['email'] not in inserted:
+            rejected.add(email=user['email'], error='email already exists')
+    return len(inserted)
+
+
+async def import_users(file: TextIO, file_format: str, chunk_size: int,
+                       workers: int, rejected: Rejections) -> int:
+    pool = HashingPool(workers=workers, max_concurrency=workers * 2, use_processes=True)
+    if hashing_pool.rounds is not None:
+        pool.set_rounds(hashing_pool.rounds)
+    imported = 0
+    pending_insert = None
+    try:
+        users = validated(read_rows(file, file_format), rejected)
+        for chunk in chunked(users, chunk_size, rejected):
+            hashed = await hash_chunk(pool, chunk)
+            if pending_insert is not None:
+                imported += await pending_insert
+            pending_insert = asyncio.create_task(insert_chunk(hashed, rejected))
+        if pending_insert is not None:
+            imported += await pending_insert
+    finally:
+        pool.shutdown()
+    return imported
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=('ndjson', 'csv'),
+                        help='defaults to the file extension')
+    parser.add_argument('--chunk-size', type=int, default=1000,
+                        help=f'users per INSERT, at most {MAX_CHUNK_SIZE}')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--report', help='write rejected rows to this NDJSON file')
+    args = parser.parse_args()
+    if not 1 <= args.chunk_size <= MAX_CHUNK_SIZE:
+        parser.error(f'--chunk-size must be between 1 and {MAX_CHUNK_SIZE}')
+
+    file_format = args.format or ('csv' if args.path.endswith('.csv') else 'ndjson')
+    report = open(args.report, 'w') if args.report else sys.stderr
+    rejected = Rejections(report)
+    try:
+        with open(args.path, newline='') as file:
+            imported = await import_users(
+                file, file_format, args.chunk_size, args.workers, rejected
+            )
+    finally:
+        if args.report:
+            report.close()
+        await engine.dispose()
+    print(f'imported {imported} users, rejected {rejected.count}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -1,5 +1,5 @@
 import re
-from typing import Optional
+from typing import List, Optional
 
 from fastapi import HTTPException
 from pydantic import BaseModel, EmailStr, validator, constr
@@ -17,15 +17,28 @@ class TunedModel(BaseModel):
         orm_mode = True
 
 
-class ShowUser(TunedModel):
+class ShowUserProfile(TunedModel):
     user_id: int
     name: str
     surname: str
     email: EmailStr
     is_active: bool
+
+
+class ShowUser(ShowUserProfile):
     posts: list
 
 
+class UserBatchItem(BaseModel):
+    user_id: int
+    found: bool
+    user: Optional[ShowUserProfile]
+
+
+class UserBatch(BaseModel):
+    items: List[UserBatchItem]
+
+
 class UserCreate(BaseModel):
     name: str
     surname: str
@@ -1,86 +1,194 @@
-from typing import List
+from typing import List, Tuple
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.actions.posts.models import ShowPostID
+from api.actions.authenticate.cache import invalidate_principal
+from api.actions.posts.models import ShowPostID, PostPage
 from api.actions.users.hashing import Hasher
-from api.actions.users.models import UserCreate, ShowUser
+from api.actions.users.models import UserCreate, ShowUser, ShowUserProfile, \
+    UserBatch, UserBatchItem
 from db.dal import UserDAL
+from http_cache import make_etag
+from pagination import decode_cursor, encode_cursor
+from response_cache import invalidate_owner
+from single_flight import coalesce
 
 
 async def _create_new_user(body: UserCreate, db: AsyncSession) -> ShowUser:
-    async with db as session:
-        async with session.begin():
-            user_dal = UserDAL(session)
-            user = await user_dal.create_user(
-                name=body.name,
-                surname=body.surname,
-                email=body.email,
-                hashed_password=Hasher.get_password_hash(body.password)
-            )
-            return ShowUser(
-                user_id=user.id,
-                name=user.name,
-                surname=user.surname,
-                email=user.email,
-                is_active=user.is_active
-            )
+    hashed_password = await Hasher.get_password_hash_async(body.password)
+    user_dal = UserDAL(db)
+    user = await user_dal.create_user(
+        name=body.name,
+        surname=body.surname,
+        email=body.email,
+        hashed_password=hashed_password
+    )
+    await db.commit()
+    return ShowUser(
+        user_id=user.id,
+        name=user.name,
+        surname=user.surname,
+        email=user.email,
+        is_active=user.is_active,
+        posts=[]
+    )
 
 
 async def _delete_user(user_id: int, db: AsyncSession) -> int | None:
-    async with db as session:
-        async with session.begin():
-            user_dal = UserDAL(session)
-            delete_user = await user_dal.delete_user(
-                user_id=user_id
-            )
-            return delete_user
+    user_dal = UserDAL(db)
+    delete_user = await user_dal.delete_user(
+        user_id=user_id
+    )
+    await db.commit()
+    if delete_user is not None:
+        invalidate_principal(delete_user)
+        await invalidate_owner(delete_user)
+    return delete_user
 
 
 async def _update_user(updated_user_params: dict, user_id: int, db: AsyncSession) -> int | None:
-    async with db as session:
-        async with session.begin():
-            user_dal = UserDAL(session)
-            update_user = await user_dal.update_user(
-                user_id=user_id,
-                **updated_user_params
-            )
-            return update_user
+    user_dal = UserDAL(db)
+    update_user = await user_dal.update_user(
+        user_id=user_id,
+        **updated_user_params
+    )
+    await db.commit()
+    if update_user is not None:
+        invalidate_principal(update_user)
+        await invalidate_owner(update_user)
+    return update_user
 
 
+@coalesce
 async def _get_user_by_id(user_id: int, db: AsyncSession,
                           all_post: list = None) -> ShowUser | None:
-    async with db as session:
-        async with session.begin():
-            user_dal = UserDAL(session)
-            get_user = await user_dal.get_user_by_id(
-                user_id=user_id
-            )
-            if get_user is not None:
-                return ShowUser(
-                    user_id=get_user.id,
-                    name=get_user.name,
-                    surname=get_user.surname,
-                    email=get_user.email,
-                    is_active=get_user.is_active,
-                    posts=all_post
-                )
+    user_dal = UserDAL(db)
+    get_user = await user_dal.get_user_by_id(
+        user_id=user_id
+    )
+    if get_user is not None:
+        return ShowUser(
+            user_id=get_user.id,
+            name=get_user.name,
+            surname=get_user.surname,
+            email=get_user.email,
+            is_active=get_user.is_active,
+            posts=all_post
+        )
+
+
+def _user_etag(user_id: int, version: int) -> str:
+    return make_etag('u', user_id, version)
+
+
+async def _get_user_etag(user_id: int, db: AsyncSession) -> str | None:
+    user_dal = UserDAL(db)
+    version = await user_dal.get_user_version(user_id=user_id)
+    if version is not None:
+        return _user_etag(user_id, version)
+
+
+@coalesce
+async def _get_user_with_etag(user_id: int, db: AsyncSession) -> Tuple[ShowUser, str] | None:
+    """User with their posts; the user row is read first so that the
+    version is never newer than the posts it is sent with"""
+
+    user_dal = UserDAL(db)
+    get_user = await user_dal.get_user_by_id(
+        user_id=user_id
+    )
+    if get_user is None:
+        return
+    all_post = await user_dal.get_all_post_by_user_id(
+        user_id=user_id
+    )
+    show_user = ShowUser(
+        user_id=get_user.id,
+        name=get_user.name,
+        surname=get_user.surname,
+        email=get_user.email,
+        is_active=get_user.is_active,
+        posts=[
+            ShowPostID(
+                post_id=post.id,
+                title=post.title,
+                body=post.body,
+                created=post.created,
+                owner_id=post.owner_id
+            ) for post in all_post]
+    )
+    return show_user, _user_etag(get_user.id, get_user.version)
+
+
+async def _get_user_profile(user_id: int, db: AsyncSession) -> ShowUserProfile | None:
+    user_dal = UserDAL(db)
+    get_user = await user_dal.get_user_by_id(
+        user_id=user_id
+    )
+    if get_user is not None:
+        return ShowUserProfile(
+            user_id=get_user.id,
+            name=get_user.name,
+            surname=get_user.surname,
+            email=get_user.email,
+            is_active=get_user.is_active
+        )
+
+
+async def _get_users_batch(user_ids: List[int], db: AsyncSession) -> UserBatch:
+    user_dal = UserDAL(db)
+    users = await user_dal.get_users_by_ids(user_ids)
+    return UserBatch(items=[
+        UserBatchItem(
+            user_id=user_id,
+            found=user is not None,
+            user=ShowUserProfile(
+                user_id=user.id,
+                name=user.name,
+                surname=user.surname,
+                email=user.email,
+                is_active=user.is_active
+            ) if user is not None else None
+        ) for user_id, user in zip(user_ids, users)])
+
+
+async def _get_posts_page(user_id: int, db: AsyncSession,
+                          limit: int, cursor: str | None = None) -> PostPage:
+    after = decode_cursor(cursor)
+    user_dal = UserDAL(db)
+    posts = await user_dal.get_posts_page_by_user_id(
+        user_id=user_id, limit=limit + 1, after=after
+    )
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor(posts[-1].created, posts[-1].id)
+    return PostPage(
+        items=[
+            ShowPostID(
+                post_id=post.id,
+                title=post.title,
+                body=post.body,
+                created=post.created,
+                owner_id=post.owner_id
+            ) for post in posts],
+        next_cursor=next_cursor
+    )
 
 
+@coalesce
 async def _get_all_post(user_id: int, db: AsyncSession) -> List[ShowPostID]:
-    async with db as session:
-        async with session.begin():
-            user_dal = UserDAL(session)
-            all_post = await user_dal.get_all_post_by_user_id(
-                user_id=user_id
-            )
-            if all(all_post) is not None:
-                return [
-                    ShowPostID(
-                        post_id=post.id,
-                        title=post.title,
-                        body=post.body,
-                        created=post.created,
-                        owner_id=post.owner_id
-                    ) for post in all_post]
+    user_dal = UserDAL(db)
+    all_post = await user_dal.get_all_post_by_user_id(
+        user_id=user_id
+    )
+    if all(all_post) is not None:
+        return [
+            ShowPostID(
+                post_id=post.id,
+                title=post.title,
+                body=post.body,
+                created=post.created,
+                owner_id=post.owner_id
+            ) for post in all_post]
 
@@ -0,0 +1,84 @@
+"""Compare the number of queries issued by the comment read path.
+
+Run from the ``src`` directory against a database that already contains
+the comment to look up::
+
+    python -m benchmarks.comment_queries --comment-id 1 --repeat 200
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import event
+
+from db.dal import CommentsDAL, PostDAL, UserDAL
+from db.session import async_session, engine
+
+
+class QueryCounter:
+    """Counts statements sent to the database through the engine"""
+
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.queries += 1
+
+
+async def legacy_read(comment_id: int) -> None:
+    """Query sequence of the comment read path before the joined query:
+    get_user_by_id, _get_post_id_by_comment, get_post_by_id (owner id,
+    owner's posts, owner, post) and _get_comment_by_id, one transaction each.
+    """
+
+    async def run(func):
+        async with async_session() as session:
+            async with session.begin():
+                return await func(session)
+
+    comment = await run(lambda s: CommentsDAL(s).get_comment_by_id(comment_id))
+    await run(lambda s: UserDAL(s).get_all_post_by_user_id(comment.user_id))
+    await run(lambda s: UserDAL(s).get_user_by_id(comment.user_id))
+    post_id = await run(lambda s: CommentsDAL(s).get_post_id_by_comment(comment_id))
+    owner_id = await run(lambda s: PostDAL(s).get_owner_id(post_id))
+    await run(lambda s: UserDAL(s).get_all_post_by_user_id(owner_id))
+    await run(lambda s: UserDAL(s).get_user_by_id(owner_id))
+    await run(lambda s: PostDAL(s).get_post_by_id(post_id))
+    await run(lambda s: CommentsDAL(s).get_comment_by_id(comment_id))
+
+
+async def joined_read(comment_id: int) -> None:
+    async with async_session() as session:
+        async with session.begin():
+            await CommentsDAL(session).get_comment_with_post_and_author(comment_id)
+
+
+async def measure(name: str, read, comment_id: int, repeat: int) -> None:
+    counter = QueryCounter()
+    event.listen(engine.sync_engine, 'before_cursor_execute', counter)
+    try:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await read(comment_id)
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', counter)
+    print(
+        f'{name:<8} queries/read: {counter.queries / repeat:5.1f}  '
+        f'mean latency: {elapsed / repeat * 1000:7.2f} ms'
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--comment-id', type=int, required=True)
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    await measure('legacy', legacy_read, args.comment_id, args.repeat)
+    await measure('joined', joined_read, args.comment_id, args.repeat)
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,212 @@
+"""HTTP benchmark for every router, driven in-process through the ASGI app.
+
+Creates its own user, post and comment, then replays each endpoint and
+reports throughput, p50/p95/p99 latency and queries per request (taken
+from the /metrics counters). Run from the ``src`` directory against a
+local database::
+
+    python -m benchmarks.http_bench --requests 500 --concurrency 20 --save run.json
+    python -m benchmarks.http_bench --compare run.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+import uuid
+from typing import Callable, Dict, List
+
+import httpx
+
+import metrics
+from db.session import engine
+from main import app
+
+
+class Scenario:
+    def __init__(self, name: str, method: str, route: str,
+                 request: Callable[[dict, int], dict], auth: bool = False):
+        self.name = name
+        self.method = method
+        self.route = route
+        self.request = request
+        self.auth = auth
+
+
+def _unique_user(fixtures: dict, n: int) -> dict:
+    return {'json': {
+        'name': 'Bench', 'surname': 'Mark',
+        'email': f'bench-{uuid.uuid4().hex}@example.com', 'password': 'benchmark'
+    }}
+
+
+SCENARIOS = [
+    Scenario('create user', 'POST', '/users/', _unique_user),
+    Scenario('get user', 'GET', '/users/',
+             lambda f, n: {'params': {'user_id': f['user_id']}}),
+    Scenario('get user profile', 'GET', '/users/profile',
+             lambda f, n: {'params': {'user_id': f['user_id']}}),
+    Scenario('get users batch', 'GET', '/users/batch',
+             lambda f, n: {'params': {'ids': ','.join(str(f['user_id'] + i) for i in range(20))}}),
+    Scenario('get user posts', 'GET', '/users/posts',
+             lambda f, n: {'params': {'user_id': f['user_id'], 'limit': 20}}),
+    Scenario('update user', 'PATCH', '/users/',
+             lambda f, n: {'json': {'name': 'Bench'}}, auth=True),
+    Scenario('create post', 'POST', '/post/',
+             lambda f, n: {'json': {'title': f'post {n}', 'body': 'benchmark body'}}, auth=True),
+    Scenario('get post', 'GET', '/post/',
+             lambda f, n: {'params': {'post_id': f['post_id']}}),
+    Scenario('get posts batch', 'GET', '/post/batch',
+             lambda f, n: {'params': {'ids': ','.join(str(f['post_id'] + i) for i in range(20))}}),
+    Scenario('feed', 'GET', '/post/feed', lambda f, n: {'params': {'limit': 20}}),
+    Scenario('search posts', 'GET', '/post/search',
+             lambda f, n: {'params': {'q': 'benchmark body', 'limit': 20}}),
+    Scenario('update post', 'PATCH', '/post/',
+             lambda f, n: {'params': {'post_id': f['post_id']}, 'json': {'body': f'edit {n}'}},
+             auth=True),
+    Scenario('create comment', 'POST', '/comment/',
+             lambda f, n: {'json': {'post_id': f['post_id'], 'body': f'comment {n}'}}, auth=True),
+    Scenario('get comment', 'GET', '/comment/',
+             lambda f, n: {'params': {'comment_id': f['comment_id']}}, auth=True),
+    Scenario('list comments', 'GET', '/comment/by_post',
+             lambda f, n: {'params': {'post_id': f['post_id'], 'limit': 20}}, auth=True),
+    Scenario('login', 'POST', '/login/token',
+             lambda f, n: {'data': {'username': f['email'], 'password': 'benchmark'}}),
+    Scenario('auth endpoint', 'GET', '/login/auth_endpoint', lambda f, n: {}, auth=True),
+]
+
+
+async def create_fixtures(client: httpx.AsyncClient) -> dict:
+    user = (await client.post('/users/', **_unique_user({}, 0))).json()
+    email = user['email']
+    token = (await client.post(
+        '/login/token', data={'username': email, 'password': 'benchmark'}
+    )).json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    post = (await client.post(
+        '/post/', json={'title': 'bench', 'body': 'benchmark body'}, headers=headers
+    )).json()
+    comment = await client.post(
+        '/comment/', json={'post_id': post['post_id'], 'body': 'bench'}, headers=headers
+    )
+    comment.raise_for_status()
+    comments = (await client.get(
+        '/comment/by_post', params={'post_id': post['post_id']}, headers=headers
+    )).json()
+    return {
+        'user_id': user['user_id'],
+        'email': email,
+        'headers': headers,
+        'post_id': post['post_id'],
+        'comment_id': comments['items'][0]['comment_id']
+    }
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def query_totals(scenario: Scenario) -> tuple:
+    labels = (('method', scenario.method), ('route', scenario.route))
+    series = metrics.db_queries_per_request.values.get(labels)
+    return (series[-2], series[-1]) if series else (0.0, 0)
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, fixtures: dict,
+                       requests: int, concurrency: int) -> Dict[str, float]:
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for n in counter:
+            kwargs = scenario.request(fixtures, n)
+            if scenario.auth:
+                kwargs['headers'] = fixtures['headers']
+            started = time.perf_counter()
+            response = await client.request(scenario.method, scenario.route, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    queries_before, count_before = query_totals(scenario)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    queries_after, count_after = query_totals(scenario)
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'errors': errors,
+        'throughput': requests / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'queries_per_request': (
+            (queries_after - queries_before) / (count_after - count_before)
+            if count_after > count_before else 0.0
+        )
+    }
+
+
+def print_results(results: dict, previous: dict | None) -> None:
+    columns = ('throughput', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request')
+    print(f'{"endpoint":<18}' + ''.join(f'{column:>22}' for column in columns) + f'{"errors":>8}')
+    for name, result in results.items():
+        cells = []
+        for column in columns:
+            cell = f'{result[column]:.2f}'
+            if previous and name in previous and previous[name][column]:
+                change = (result[column] / previous[name][column] - 1) * 100
+                cell += f' ({change:+.1f}%)'
+            cells.append(f'{cell:>22}')
+        print(f'{name:<18}' + ''.join(cells) + f'{result["errors"]:>8}')
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--only', nargs='*', help='scenario names to run')
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--compare', help='previous results JSON file to compare with')
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as file:
+            previous = json.load(file)['results']
+
+    await app.router.startup()
+    try:
+        async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app, raise_app_exceptions=False),
+                base_url='http://bench'
+        ) as client:
+            fixtures = await create_fixtures(client)
+            results = {}
+            for scenario in SCENARIOS:
+                if args.only and scenario.name not in args.only:
+                    continue
+                results[scenario.name] = await run_scenario(
+                    client, scenario, fixtures, args.requests, args.concurrency
+                )
+    finally:
+        await app.router.shutdown()
+        await engine.dispose()
+
+    print_results(results, previous)
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump({
+                'requests': args.requests,
+                'concurrency': args.concurrency,
+                'results': results
+            }, file, indent=2)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,143 @@
+"""Bulk-load synthetic users, posts and comments with Postgres COPY.
+
+Posts per user and comments per post follow a Pareto distribution, so a
+few authors and threads are much larger than the rest, as in production.
+All users share one precomputed password hash. Run from the ``src``
+directory::
+
+    python -m benchmarks.seed --users 1000000 --posts-per-user 5 --comments-per-post 3
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from api.actions.users.hashing import Hasher
+from db.session import engine
+
+
+def skewed(rng: random.Random, mean: float, alpha: float) -> int:
+    """Pareto sample with the given mean (alpha > 1, smaller is more skewed)"""
+
+    if mean <= 0:
+        return 0
+    scale = mean * (alpha - 1) / alpha
+    return int(rng.paretovariate(alpha) * scale)
+
+
+class Generator:
+    def __init__(self, args, first_ids: dict, hashed_password: str):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.hashed_password = hashed_password
+        self.first_user_id = first_ids['users']
+        self.first_post_id = first_ids['posts']
+        self.next_post_id = first_ids['posts']
+        self.next_comment_id = first_ids['comments']
+        self.now = datetime.utcnow()
+
+    def created(self) -> datetime:
+        return self.now - timedelta(seconds=self.rng.uniform(0, self.args.days * 86400))
+
+    def users(self) -> Iterator[tuple]:
+        for n in range(self.args.users):
+            user_id = self.first_user_id + n
+            yield (
+                user_id, f'Name{user_id % 997}', f'Surname{user_id % 991}',
+                f'seed-{user_id}@example.com', True, self.hashed_password
+            )
+
+    def posts(self) -> Iterator[tuple]:
+        args = self.args
+        for n in range(args.users):
+            owner_id = self.first_user_id + n
+            for _ in range(skewed(self.rng, args.posts_per_user, args.skew)):
+                post_id = self.next_post_id
+                self.next_post_id += 1
+                yield (
+                    post_id, f'Post {post_id}',
+                    f'Synthetic body of post {post_id} by user {owner_id}. ' * 4,
+                    self.created(), owner_id
+                )
+
+    def comments(self) -> Iterator[tuple]:
+        args = self.args
+        last_user_id = self.first_user_id + args.users - 1
+        # post ids are contiguous, so comments need posts() to have run first
+        for post_id in range(self.first_post_id, self.next_post_id):
+            for _ in range(skewed(self.rng, args.comments_per_post, args.skew)):
+                comment_id = self.next_comment_id
+                self.next_comment_id += 1
+                yield (
+                    comment_id, f'Synthetic comment {comment_id}', post_id,
+                    self.rng.randint(self.first_user_id, last_user_id), self.created()
+                )
+
+
+def chunks(rows: Iterator[tuple], size: int) -> Iterator[list]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def copy(connection, table: str, columns: list, rows: Iterator[tuple], batch: int) -> int:
+    started = time.perf_counter()
+    total = 0
+    for chunk in chunks(rows, batch):
+        await connection.copy_records_to_table(table, records=chunk, columns=columns)
+        total += len(chunk)
+    elapsed = time.perf_counter() - started
+    print(f'{table:<9} {total:>12} rows  {total / max(elapsed, 1e-9):>10.0f} rows/s')
+    return total
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--posts-per-user', type=float, default=5)
+    parser.add_argument('--comments-per-post', type=float, default=3)
+    parser.add_argument('--skew', type=float, default=1.5,
+                        help='Pareto shape, closer to 1 means heavier skew')
+    parser.add_argument('--days', type=int, default=365, help='spread of created timestamps')
+    parser.add_argument('--batch', type=int, default=50000, help='rows per COPY')
+    parser.add_argument('--password', default='password')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    hashed_password = Hasher.get_password_hash(args.password)
+
+    async with engine.connect() as sa_connection:
+        raw_connection = await sa_connection.get_raw_connection()
+        connection = raw_connection.driver_connection
+        async with connection.transaction():
+            first_ids = {
+                table: await connection.fetchval(f'SELECT coalesce(max(id), 0) + 1 FROM {table}')
+                for table in ('users', 'posts', 'comments')
+            }
+            generator = Generator(args, first_ids, hashed_password)
+            await copy(connection, 'users',
+                       ['id', 'name', 'surname', 'email', 'is_active', 'hashed_password'],
+                       generator.users(), args.batch)
+            await copy(connection, 'posts', ['id', 'title', 'body', 'created', 'owner_id'],
+                       generator.posts(), args.batch)
+            await copy(connection, 'comments', ['id', 'body', 'post_id', 'user_id', 'created'],
+                       generator.comments(), args.batch)
+            for table in ('users', 'posts', 'comments'):
+                await connection.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"(SELECT coalesce(max(id), 1) FROM {table}))"
+                )
+        for table in ('users', 'posts', 'comments'):
+            await connection.execute(f'ANALYZE {table}')
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
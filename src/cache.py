@@ -0,0 +1,155 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Protocol, Set
+
+
+class TTLCache:
+    """Bounded in-process LRU cache whose entries expire after ``ttl`` seconds.
+
+    Meant to be used from the event loop only, so no locking is done.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Any | None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            return entry[1]
+
+    def discard_if(self, predicate: Callable[[Any], bool]) -> int:
+        """Drop every entry whose value matches ``predicate``"""
+
+        keys = [key for key, (_, value) in self._data.items() if predicate(value)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0
+        }
+
+
+class CacheBackend(Protocol):
+    """Storage for serialized responses. Async so that a network backend
+    such as Redis can implement it; tags group keys for invalidation."""
+
+    async def get(self, key: str) -> bytes | None: ...
+
+    async def set(self, key: str, value: bytes, tags: Iterable[str] = ()) -> None: ...
+
+    async def delete(self, key: str) -> None: ...
+
+    async def invalidate_tag(self, tag: str) -> None: ...
+
+    def stats(self) -> dict: ...
+
+
+class MemoryCacheBackend:
+    """In-process LRU/TTL CacheBackend bounded by entry count and bytes"""
+
+    def __init__(self, maxsize: int, ttl: float, max_bytes: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._data: OrderedDict = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return
+        expires_at, value, _ = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, value: bytes, tags: Iterable[str] = ()) -> None:
+        if self.maxsize <= 0 or len(value) > self.max_bytes:
+            return
+        self._remove(key)
+        tags = tuple(tags)
+        self._data[key] = (time.monotonic() + self.ttl, value, tags)
+        self.bytes += len(value)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._data) > self.maxsize or self.bytes > self.max_bytes:
+            self._remove(next(iter(self._data)))
+
+    async def delete(self, key: str) -> None:
+        self._remove(key)
+
+    async def invalidate_tag(self, tag: str) -> None:
+        for key in self._tags.pop(tag, ()):
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        _, value, tags = entry
+        self.bytes -= len(value)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0
+        }
@@ -1,8 +1,13 @@
-from typing import List
+from datetime import datetime
+from typing import List, Tuple
 
-from sqlalchemy import update, and_, select, delete
+from sqlalchemy import update, and_, select, delete, tuple_, insert, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from db.models import User, Post, Comment
+
+import settings
+from db.loader import get_loader
+from db.models import User, Post, Comment, SEARCH_CONFIG
 
 
 # Block business context
@@ -27,11 +32,26 @@ class UserDAL:
 
         return new_user
 
+    async def create_users(self, users: List[dict]) -> List[str]:
+        """Insert many users in one statement, skipping emails that already
+        exist; returns the emails that were inserted"""
+
+        query = (
+            pg_insert(User)
+            .values(users)
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User.email)
+        )
+        result = await self.db_session.execute(query)
+        return [row[0] for row in result.fetchall()]
+
     async def delete_user(self, user_id: int) -> int | None:
         query = (
             update(User)
             .where(and_(User.id == user_id, User.is_active == True))
-            .values(is_active=False).returning(User.id)
+            .values(is_active=False, version=User.version + 1,
+                    updated_at=datetime.utcnow())
+            .returning(User.id)
         )
         result = await self.db_session.execute(query)
         delete_user_id_row = result.fetchone()
@@ -39,13 +59,12 @@ class UserDAL:
             return delete_user_id_row[0]
 
     async def get_user_by_id(self, user_id: int) -> User | None:
-        query = (
-            select(User).where(and_(User.id == user_id))
-        )
-        result = await self.db_session.execute(query)
-        user_row = result.fetchone()
-        if user_row is not None:
-            return user_row[0]
+        return await get_loader(self.db_session, User).load(user_id)
+
+    async def get_users_by_ids(self, user_ids: List[int]) -> List[User | None]:
+        """Users in input order, None where an id does not exist"""
+
+        return await get_loader(self.db_session, User).load_many(user_ids)
 
     async def get_all_post_by_user_id(self, user_id: int) -> List[Post] | None:
         query = (
@@ -56,17 +75,40 @@ class UserDAL:
         if all(all_posts) is not None:
             return [post[0] for post in all_posts]
 
+    async def get_posts_page_by_user_id(
+            self, user_id: int, limit: int,
+            after: Tuple[datetime, int] | None = None
+    ) -> List[Post]:
+        """User's posts, newest first, starting after the (created, id) key"""
+
+        query = select(Post).where(and_(Post.owner_id == user_id))
+        if after is not None:
+            query = query.where(tuple_(Post.created, Post.id) < tuple_(*after))
+        query = query.order_by(Post.created.desc(), Post.id.desc()).limit(limit)
+        result = await self.db_session.execute(query)
+        return list(result.scalars())
+
     async def update_user(self, user_id: int, **kwargs) -> int | None:
         query = (
             update(User).
             where(and_(User.id == user_id, User.is_active == True)).
-            values(kwargs).returning(User.id)
+            values(kwargs).
+            values(version=User.version + 1, updated_at=datetime.utcnow()).
+            returning(User.id)
         )
         result = await self.db_session.execute(query)
         update_user_id_row = result.fetchone()
         if update_user_id_row is not None:
             return update_user_id_row[0]
 
+    async def get_user_version(self, user_id: int) -> int | None:
+        query = (
+            select(User.version).where(and_(User.id == user_id))
+        )
+        result = await self.db_session.execute(query)
+        version = result.fetchone()
+        return version[0] if version else None
+
     async def get_user_by_email(self, email: str) -> User | None:
         query = (
             select(User).where(and_(User.email == email))
@@ -83,6 +125,16 @@ class PostDAL:
     def __init__(self, db_session: AsyncSession):
         self.db_session = db_session
 
+    async def _touch_owner(self, owner_id: int) -> None:
+        """Bump the owner's version, user payloads embed their posts"""
+
+        query = (
+            update(User)
+            .where(and_(User.id == owner_id))
+            .values(version=User.version + 1, updated_at=datetime.utcnow())
+        )
+        await self.db_session.execute(query)
+
     async def create_post(
             self, title: str, body: str, owner_id: int
     ) -> Post:
@@ -93,25 +145,51 @@ class PostDAL:
         )
         self.db_session.add(new_post)
         await self.db_session.flush()
+        await self._touch_owner(owner_id)
 
         return new_post
 
+    async def create_posts(
+            self, owner_id: int, posts: List[dict]
+    ) -> List[Tuple[int, datetime]]:
+        """Insert many posts with one multi-row INSERT, returns (id, created)
+        in input order.
+
+        RETURNING does not promise the order of the VALUES rows, so the ids
+        are drawn from the sequence first and inserted explicitly.
+        """
+
+        created = datetime.utcnow()
+        ids_query = select(
+            func.nextval(func.pg_get_serial_sequence(Post.__tablename__, 'id'))
+        ).select_from(func.generate_series(1, len(posts)))
+        result = await self.db_session.execute(ids_query)
+        post_ids = [row[0] for row in result.fetchall()]
+        query = insert(Post).values([
+            dict(id=post_id, title=post['title'], body=post['body'],
+                 owner_id=owner_id, created=created)
+            for post_id, post in zip(post_ids, posts)
+        ])
+        await self.db_session.execute(query)
+        await self._touch_owner(owner_id)
+        return [(post_id, created) for post_id in post_ids]
+
     async def delete_post(self, post_id: int) -> Post | None:
         query = delete(Post).\
-            where(and_(Post.id == post_id)).returning(Post.id)
+            where(and_(Post.id == post_id)).returning(Post.id, Post.owner_id)
         result = await self.db_session.execute(query)
         deleted_post_id_row = result.fetchone()
         if deleted_post_id_row is not None:
+            await self._touch_owner(deleted_post_id_row[1])
             return deleted_post_id_row[0]
 
     async def get_post_by_id(self, post_id: int) -> Post | None:
-        query = (
-            select(Post).where(and_(Post.id == post_id))
-        )
-        result = await self.db_session.execute(query)
-        post_row = result.fetchone()
-        if post_row is not None:
-            return post_row[0]
+        return await get_loader(self.db_session, Post).load(post_id)
+
+    async def get_posts_by_ids(self, post_ids: List[int]) -> List[Post | None]:
+        """Posts in input order, None where an id does not exist"""
+
+        return await get_loader(self.db_session, Post).load_many(post_ids)
 
     async def get_owner_id(self, post_id: int) -> int | None:
         query = (
@@ -121,15 +199,101 @@ class PostDAL:
         owner_id = result.fetchone()
         return owner_id[0] if owner_id else None
 
+    async def get_post_versions(self, post_id: int) -> Tuple[int, int] | None:
+        """Versions of a post and of its owner"""
+
+        query = (
+            select(Post.version, User.version)
+            .join(User, User.id == Post.owner_id)
+            .where(and_(Post.id == post_id))
+        )
+        result = await self.db_session.execute(query)
+        versions = result.fetchone()
+        if versions is not None:
+            return versions[0], versions[1]
+
+    async def get_post_with_owner(
+            self, post_id: int
+    ) -> Tuple[Post, User, List[Post]] | None:
+        """Load a post, its owner and all the owner's posts in one statement"""
+
+        owner_id = (
+            select(Post.owner_id).where(and_(Post.id == post_id))
+        ).scalar_subquery()
+        query = (
+            select(User, Post)
+            .join(Post, Post.owner_id == User.id)
+            .where(and_(User.id == owner_id))
+        )
+        result = await self.db_session.execute(query)
+        rows = result.fetchall()
+        if not rows:
+            return
+        owner = rows[0][0]
+        owner_posts = [row[1] for row in rows]
+        post = next(post for post in owner_posts if post.id == post_id)
+        return post, owner, owner_posts
+
+    async def get_latest_posts(
+            self, limit: int, after: Tuple[datetime, int] | None = None
+    ) -> List[Post]:
+        """Posts of all users, newest first, starting after the (created, id) key"""
+
+        query = select(Post)
+        if after is not None:
+            query = query.where(tuple_(Post.created, Post.id) < tuple_(*after))
+        query = query.order_by(Post.created.desc(), Post.id.desc()).limit(limit)
+        result = await self.db_session.execute(query)
+        return list(result.scalars())
+
+    async def search(
+            self, text: str, limit: int, headline_options: str,
+            after: Tuple[float, int] | None = None
+    ) -> List[Tuple[Post, float, str]]:
+        """Posts matching a web-search style query, best match first,
+        starting after the (rank, id) key, with a highlighted body snippet.
+
+        The GIN index finds the matches; only the first
+        SEARCH_MAX_CANDIDATES of them are ranked, so a query matching more
+        posts than that pages through the best of those, not of all.
+        Snippets are only built for the rows of the page.
+        """
+
+        tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, text)
+        candidates = select(
+            Post.id, func.ts_rank_cd(Post.search_vector, tsquery).label('rank')
+        ).where(
+            Post.search_vector.bool_op('@@')(tsquery)
+        ).limit(settings.SEARCH_MAX_CANDIDATES).subquery()
+        page = select(candidates.c.id, candidates.c.rank)
+        if after is not None:
+            page = page.where(tuple_(candidates.c.rank, candidates.c.id) < tuple_(*after))
+        page = page.order_by(
+            candidates.c.rank.desc(), candidates.c.id.desc()
+        ).limit(limit).subquery()
+        query = (
+            select(
+                Post, page.c.rank,
+                func.ts_headline(SEARCH_CONFIG, Post.body, tsquery, headline_options)
+            )
+            .join(page, page.c.id == Post.id)
+            .order_by(page.c.rank.desc(), Post.id.desc())
+        )
+        result = await self.db_session.execute(query)
+        return [(row[0], row[1], row[2]) for row in result.fetchall()]
+
     async def update_post(self, post_id: int, **kwargs) -> Post | None:
         query = (
             update(Post).
             where(and_(Post.id == post_id)).
-            values(kwargs).returning(Post.id)
+            values(kwargs).
+            values(version=Post.version + 1, updated_at=datetime.utcnow()).
+            returning(Post.id, Post.owner_id)
         )
         result = await self.db_session.execute(query)
         updated_post = result.fetchone()
         if updated_post is not None:
+            await self._touch_owner(updated_post[1])
             return updated_post[0]
 
 
@@ -161,6 +325,40 @@ class CommentsDAL:
         if get_comment_id is not None:
             return get_comment_id[0]
 
+    async def get_comment_with_post_and_author(
+            self, comment_id: int
+    ) -> Tuple[Comment, Post, User] | None:
+        """Load a comment together with its post and author in one statement"""
+
+        query = (
+            select(Comment, Post, User)
+            .join(Post, Post.id == Comment.post_id)
+            .join(User, User.id == Comment.user_id)
+            .where(and_(Comment.id == comment_id))
+        )
+        result = await self.db_session.execute(query)
+        comment_row = result.fetchone()
+        if comment_row is not None:
+            return comment_row[0], comment_row[1], comment_row[2]
+
+    async def get_comments_page_by_post_id(
+            self, post_id: int, limit: int,
+            after: Tuple[datetime, int] | None = None
+    ) -> List[Tuple[Comment, User]]:
+        """Post's comments with their authors, oldest first, starting after
+        the (created, id) key"""
+
+        query = (
+            select(Comment, User)
+            .join(User, User.id == Comment.user_id)
+            .where(and_(Comment.post_id == post_id))
+        )
+        if after is not None:
+            query = query.where(tuple_(Comment.created, Comment.id) > tuple_(*after))
+        query = query.order_by(Comment.created, Comment.id).limit(limit)
+        result = await self.db_session.execute(query)
+        return [(row[0], row[1]) for row in result.fetchall()]
+
     async def get_post_id_by_comment(self, comment_id: int) -> int | None:
         query = (
             select(Comment.post_id).where(and_(Comment.id == comment_id))
@@ -0,0 +1,93 @@
+import asyncio
+from typing import Dict, Iterable, List
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+class Loader:
+    """Batches primary key lookups of one model on one session.
+
+    Ids requested during the same event loop tick are fetched with a single
+    ``WHERE id IN (...)``; every id is fetched at most once while the
+    session lives, until the session writes to the database.
+    """
+
+    def __init__(self, session: AsyncSession, model):
+        self.session = session
+        self.model = model
+        self.batches = 0
+        self._results: Dict[int, asyncio.Future] = {}
+        self._queue: List[int] = []
+
+    async def load(self, key: int):
+        result = self._results.get(key)
+        if result is None:
+            loop = asyncio.get_running_loop()
+            result = loop.create_future()
+            self._results[key] = result
+            self._queue.append(key)
+            if len(self._queue) == 1:
+                loop.call_soon(self._dispatch)
+        # a cancelled caller must not cancel the lookup shared with others
+        return await asyncio.shield(result)
+
+    async def load_many(self, keys: Iterable[int]) -> list:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def clear(self) -> None:
+        self._results = {
+            key: result for key, result in self._results.items() if not result.done()
+        }
+
+    def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        asyncio.ensure_future(self._fetch(keys))
+
+    async def _fetch(self, keys: List[int]) -> None:
+        self.batches += 1
+        rows = None
+        error: Exception | None = None
+        try:
+            query = select(self.model).where(self.model.id.in_(keys))
+            result = await self.session.execute(query)
+            rows = {row.id: row for row in result.scalars()}
+        except Exception as err:
+            error = err
+        finally:
+            # cancelled or failed, nobody may be left waiting on these keys
+            for key in keys:
+                pending = self._results.get(key) if rows is not None else self._results.pop(key, None)
+                if pending is None or pending.done():
+                    continue
+                if rows is not None:
+                    pending.set_result(rows.get(key))
+                elif error is not None:
+                    pending.set_exception(error)
+                else:
+                    pending.cancel()
+
+
+def get_loader(session: AsyncSession, model) -> Loader:
+    loaders = session.info.setdefault('loaders', {})
+    loader = loaders.get(model)
+    if loader is None:
+        loader = loaders[model] = Loader(session, model)
+    return loader
+
+
+def _clear_loaders(session: Session) -> None:
+    for loader in session.info.get('loaders', {}).values():
+        loader.clear()
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _clear_on_write(orm_execute_state) -> None:
+    if not orm_execute_state.is_select:
+        _clear_loaders(orm_execute_state.session)
+
+
+@event.listens_for(Session, 'after_flush')
+def _clear_on_flush(session: Session, flush_context) -> None:
+    _clear_loaders(session)
@@ -1,11 +1,15 @@
 from datetime import datetime
 from sqlalchemy import Column, String, Boolean, Integer, DateTime, \
-    ForeignKey, Text
-from sqlalchemy.orm import declarative_base
+    ForeignKey, Text, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import declarative_base, deferred
 
 
 Base = declarative_base()
 
+# text search configuration of posts.search_vector, queries must use the same
+SEARCH_CONFIG = 'english'
+
 
 class User(Base):
 
@@ -17,6 +21,8 @@ class User(Base):
     email = Column(String, nullable=False, unique=True)
     is_active = Column(Boolean(), default=True)
     hashed_password = Column(String, nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default='1')
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
 
 class Post(Base):
@@ -26,8 +32,23 @@ class Post(Base):
     id = Column(Integer, primary_key=True)
     title = Column(String, nullable=False)
     body = Column(Text, nullable=False)
-    created = Column(DateTime, default=datetime.utcnow())
+    created = Column(DateTime, default=datetime.utcnow)
     owner_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default='1')
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    # title matches rank above body matches; deferred so that loading
+    # posts does not carry the vector along
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', title), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', body), 'B')",
+        persisted=True
+    )))
+
+    __table_args__ = (
+        Index('ix_posts_owner_id_created_id', 'owner_id', 'created', 'id'),
+        Index('ix_posts_created_id', 'created', 'id'),
+        Index('ix_posts_search_vector', 'search_vector', postgresql_using='gin'),
+    )
 
 
 class Comment(Base):
@@ -38,4 +59,9 @@ class Comment(Base):
     body = Column(Text, nullable=False)
     post_id = Column(Integer, ForeignKey('posts.id'), nullable=False)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
-    created = Column(DateTime, default=datetime.utcnow())
\ No newline at end of file
+    created = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_comments_post_id_created_id', 'post_id', 'created', 'id'),
+        Index('ix_comments_user_id', 'user_id'),
+    )
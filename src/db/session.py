@@ -1,22 +1,136 @@
+import itertools
+import math
+import time
 from typing import Generator
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import sessionmaker
+from fastapi import Request, Response
+from sqlalchemy import event, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, \
+    async_sessionmaker
+from sqlalchemy.orm import Session
 
 import settings
+from db.pool import InstrumentedQueuePool
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    return create_async_engine(
+        make_url(url).update_query_dict({
+            'prepared_statement_cache_size': str(settings.DB_PREPARED_STATEMENT_CACHE_SIZE)
+        }),
+        future=True,
+        echo=settings.DB_ECHO,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING
+    )
+
 
 # create async engine
-engine = create_async_engine(settings.DATABASE_URL, future=True, echo=True)
+engine = _create_engine(settings.DATABASE_URL)
+
+# connections checked out through this engine run read-only transactions
+read_only_engine = engine.execution_options(postgresql_readonly=True)
+
+# one pool per streaming replica, read-only requests take turns on them
+replica_engines = [
+    _create_engine(url).execution_options(postgresql_readonly=True)
+    for url in settings.DATABASE_REPLICA_URLS
+]
+_next_replica = itertools.cycle(replica_engines)
+
+
+class RoutingSession(Session):
+    """Sends the queries of a read-only unit of work to its replica.
+
+    The first write or flush unpins the replica, so from then on the
+    session reads its own writes from the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get('replica')
+        if replica is not None:
+            return replica.sync_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _unpin_on_write(orm_execute_state) -> None:
+    # text() statements are neither, they stay where the session is
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info.pop('replica', None)
+
+
+@event.listens_for(RoutingSession, 'before_flush')
+def _unpin_on_flush(session: Session, flush_context, instances) -> None:
+    session.info.pop('replica', None)
+
 
 # create session
-async_session = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+async_session = async_sessionmaker(
+    engine, expire_on_commit=False, class_=AsyncSession, sync_session_class=RoutingSession
+)
 
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
 
-async def get_db() -> Generator:
-    """Dependency for getting async setting"""
 
+def read_only_session(use_replica: bool = True) -> AsyncSession:
+    """Session for a read-only unit of work, on a replica when there are any"""
+
+    session = async_session(bind=read_only_engine)
+    if replica_engines and use_replica:
+        session.info['replica'] = next(_next_replica)
+    return session
+
+
+# a client that wrote keeps reading from the primary until this time
+PRIMARY_UNTIL_COOKIE = 'primary_until'
+
+
+def _pinned_to_primary(request: Request) -> bool:
+    try:
+        until = float(request.cookies.get(PRIMARY_UNTIL_COOKIE, 0))
+    except ValueError:
+        return False
+    now = time.time()
+    # a forged far-future value must not keep a client off the replicas
+    return now < until <= now + settings.DATABASE_REPLICA_MAX_LAG
+
+
+async def get_db(request: Request, response: Response) -> Generator:
+    """Request-scoped unit of work.
+
+    Every helper of a request shares this session and its one transaction,
+    which begins on the first query. Write helpers commit it themselves so
+    the commit happens before the response is sent; whatever is left open
+    is rolled back when the session closes. Safe methods get a read-only
+    transaction, on a replica when DATABASE_REPLICA_URLS is set, unless
+    the client wrote within the last DATABASE_REPLICA_MAX_LAG seconds.
+    """
+
+    if request.method in SAFE_METHODS:
+        session = read_only_session(use_replica=not _pinned_to_primary(request))
+    else:
+        session = async_session()
+        if replica_engines:
+            response.set_cookie(
+                PRIMARY_UNTIL_COOKIE,
+                f'{time.time() + settings.DATABASE_REPLICA_MAX_LAG:.3f}',
+                max_age=math.ceil(settings.DATABASE_REPLICA_MAX_LAG),
+                httponly=True, samesite='lax'
+            )
     try:
-        session: AsyncSession = async_session()
         yield session
     finally:
         await session.close()
+
+
+def replica_lag(session: AsyncSession) -> float:
+    """How far behind the primary the session's reads may be"""
+
+    if session.info.get('replica') is not None:
+        return settings.DATABASE_REPLICA_MAX_LAG
+    return 0.0
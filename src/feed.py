@@ -0,0 +1,127 @@
+import time
+from collections import deque
+from datetime import datetime
+from typing import Iterable, List, Tuple
+
+import settings
+from api.actions.posts.models import ShowPostID
+
+
+def _key(post: ShowPostID) -> Tuple[datetime, int]:
+    return post.created, post.post_id
+
+
+class FeedBuffer:
+    """Ring buffer of the newest posts across all users, newest first.
+
+    Hydrated from the database at startup, re-hydrated every ``max_age``
+    seconds to pick up writes of other workers, and kept current in
+    between by the post write helpers of this process. It always holds a
+    prefix of the feed; ``exhaustive`` means that prefix is the whole posts
+    table. A buffer older than twice ``max_age`` is not served from.
+    """
+
+    def __init__(self, size: int, max_age: float):
+        self.size = size
+        self.max_age = max_age
+        self.hydrated = False
+        self.exhaustive = False
+        self.hydrated_at = 0.0
+        self.hits = 0
+        self.fallbacks = 0
+        self._writes = 0
+        self._posts: deque = deque(maxlen=size)
+
+    def write_token(self) -> int:
+        """Taken before loading posts for ``hydrate``"""
+
+        return self._writes
+
+    def hydrate(self, posts: List[ShowPostID], token: int | None = None) -> bool:
+        # a local write made while the posts were loading may be missing
+        # from them, keep the current buffer until the next refresh
+        if token is not None and token != self._writes:
+            return False
+        self._posts = deque(sorted(posts, key=_key, reverse=True)[:self.size], maxlen=self.size)
+        self.exhaustive = len(posts) < self.size
+        self.hydrated = True
+        self.hydrated_at = time.monotonic()
+        return True
+
+    def add(self, post: ShowPostID) -> None:
+        self._writes += 1
+        if not self.hydrated or self.size <= 0:
+            return
+        older_than_tail = not self._posts or _key(post) < _key(self._posts[-1])
+        if len(self._posts) == self.size:
+            if older_than_tail:
+                self.exhaustive = False
+                return
+            self._posts.pop()
+            self.exhaustive = False
+        elif older_than_tail and not self.exhaustive:
+            # posts between the tail and this one may be missing
+            return
+        # posts committed out of order are rare, new ones mostly go first
+        index = 0
+        while index < len(self._posts) and _key(self._posts[index]) > _key(post):
+            index += 1
+        self._posts.insert(index, post)
+
+    def add_many(self, posts: Iterable[ShowPostID]) -> None:
+        for post in posts:
+            self.add(post)
+
+    def update(self, post_id: int, **fields) -> None:
+        self._writes += 1
+        for index, post in enumerate(self._posts):
+            if post.post_id == post_id:
+                self._posts[index] = post.copy(update=fields)
+                return
+
+    def discard(self, post_id: int) -> None:
+        self._writes += 1
+        for post in self._posts:
+            if post.post_id == post_id:
+                self._posts.remove(post)
+                return
+
+    def page(self, limit: int,
+             after: Tuple[datetime, int] | None = None) -> List[ShowPostID] | None:
+        """Up to ``limit + 1`` posts after the key, or None when the buffer
+        cannot tell whether older posts exist and the database must answer"""
+
+        if not self.fresh():
+            self.fallbacks += 1
+            return
+        posts = []
+        for post in self._posts:
+            if after is None or _key(post) < after:
+                posts.append(post)
+                if len(posts) > limit:
+                    break
+        if len(posts) > limit or self.exhaustive:
+            self.hits += 1
+            return posts
+        self.fallbacks += 1
+
+    def fresh(self) -> bool:
+        if not self.hydrated:
+            return False
+        return self.max_age <= 0 or time.monotonic() - self.hydrated_at <= 2 * self.max_age
+
+    def stats(self) -> dict:
+        pages = self.hits + self.fallbacks
+        return {
+            'size': len(self._posts),
+            'maxsize': self.size,
+            'hydrated': self.hydrated,
+            'fresh': self.fresh(),
+            'exhaustive': self.exhaustive,
+            'hits': self.hits,
+            'fallbacks': self.fallbacks,
+            'hit_ratio': self.hits / pages if pages else 0.0
+        }
+
+
+latest_posts = FeedBuffer(settings.FEED_BUFFER_SIZE, settings.FEED_REFRESH_SECONDS)
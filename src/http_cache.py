@@ -0,0 +1,23 @@
+from typing import Dict
+
+import settings
+
+
+def make_etag(*parts) -> str:
+    """Strong validator built from row ids and versions"""
+
+    return '"' + '.'.join(str(part) for part in parts) + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # weak comparison, as RFC 9110 asks for If-None-Match
+    candidates = (tag.strip() for tag in if_none_match.split(','))
+    return etag.removeprefix('W/') in (tag.removeprefix('W/') for tag in candidates)
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    return {'ETag': etag, 'Cache-Control': settings.HTTP_CACHE_CONTROL}
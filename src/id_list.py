@@ -0,0 +1,22 @@
+from typing import List
+
+from fastapi import HTTPException
+
+import settings
+
+
+def parse_ids(values: List[str]) -> List[int]:
+    """Ids from ``?ids=1,2&ids=3``, in request order and capped at
+    BATCH_MAX_IDS"""
+
+    try:
+        ids = [int(part) for value in values for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail='ids must be integers')
+    if not ids:
+        raise HTTPException(status_code=422, detail='At least one id should be provided')
+    if len(ids) > settings.BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=422, detail=f'At most {settings.BATCH_MAX_IDS} ids per request'
+        )
+    return ids
@@ -1,10 +1,26 @@
+import asyncio
+from logging import getLogger
+
 import uvicorn
 from fastapi import FastAPI, APIRouter
+
+import settings
+from metrics import MetricsMiddleware, instrument_engine, register_collector
 from api.actions.users.handlers import user_route
 from api.actions.posts.handlers import post_route
+from api.actions.posts.optional import _load_latest_posts
 from api.actions.comments.handlers import comment_router
 from api.actions.authenticate.login_handlers import login_router
+from api.actions.authenticate.cache import principal_cache
+from api.actions.internal.handlers import internal_router, metrics_router
+from api.actions.users.hashing import hashing_pool
+from db.session import async_session, engine, read_only_engine, replica_engines
+from feed import latest_posts
+from response_cache import response_cache
+from single_flight import single_flight
+
 
+logger = getLogger(__name__)
 
 app = FastAPI()
 
@@ -16,7 +32,57 @@ main_api_route.include_router(user_route, prefix='/users', tags=['users'])
 main_api_route.include_router(post_route, prefix='/post', tags=['post'])
 main_api_route.include_router(login_router, prefix='/login', tags=['login'])
 main_api_route.include_router(comment_router, prefix='/comment', tags=['comment'])
+main_api_route.include_router(internal_router, prefix='/internal', tags=['internal'])
 app.include_router(main_api_route)
+app.include_router(metrics_router, tags=['internal'])
+
+# per-route latency and database work, exposed at /metrics
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+register_collector('db_pool', lambda: engine.sync_engine.pool.stats())
+for number, replica_engine in enumerate(replica_engines):
+    instrument_engine(replica_engine)
+    register_collector(f'db_replica{number}_pool', replica_engine.sync_engine.pool.stats)
+register_collector('principal_cache', principal_cache.stats)
+register_collector('hasher', hashing_pool.stats)
+register_collector('response_cache', response_cache.stats)
+register_collector('single_flight', single_flight.stats)
+register_collector('feed', latest_posts.stats)
+
+
+@app.on_event('startup')
+async def startup() -> None:
+    try:
+        await refresh_feed()
+    except Exception:
+        logger.exception('Could not load the feed buffer, serving the feed from the database')
+    if settings.FEED_REFRESH_SECONDS > 0:
+        app.state.feed_refresher = asyncio.create_task(refresh_feed_forever())
+
+
+@app.on_event('shutdown')
+async def shutdown() -> None:
+    feed_refresher = getattr(app.state, 'feed_refresher', None)
+    if feed_refresher is not None:
+        feed_refresher.cancel()
+    hashing_pool.shutdown()
+
+
+async def refresh_feed() -> None:
+    token = latest_posts.write_token()
+    # from the primary, a lagging replica could bring back deleted posts
+    async with async_session(bind=read_only_engine) as session:
+        posts = await _load_latest_posts(session, settings.FEED_BUFFER_SIZE)
+    latest_posts.hydrate(posts, token)
+
+
+async def refresh_feed_forever() -> None:
+    while True:
+        await asyncio.sleep(settings.FEED_REFRESH_SECONDS)
+        try:
+            await refresh_feed()
+        except Exception:
+            logger.exception('Could not refresh the feed buffer')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,174 @@
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Callable, Dict, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self.values: Dict[Tuple, float] = defaultdict(float)
+
+    def inc(self, labels: Tuple[Tuple[str, str], ...], amount: float = 1) -> None:
+        self.values[labels] += amount
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        for labels, value in self.values.items():
+            lines.append(f'{self.name}{_format_labels(labels)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: tuple):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.values: Dict[Tuple, list] = {}
+
+    def observe(self, labels: Tuple[Tuple[str, str], ...], value: float) -> None:
+        series = self.values.get(labels)
+        if series is None:
+            # one counter per bucket, then +Inf, sum and count
+            series = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+        series[len(self.buckets)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, series in self.values.items():
+            for index, bound in enumerate(self.buckets):
+                bucket_labels = labels + (('le', str(bound)),)
+                lines.append(f'{self.name}_bucket{_format_labels(bucket_labels)} {series[index]}')
+            inf_labels = labels + (('le', '+Inf'),)
+            lines.append(f'{self.name}_bucket{_format_labels(inf_labels)} {series[len(self.buckets)]}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {series[-2]}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {series[-1]}')
+        return lines
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        ) for key, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+request_duration = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route', LATENCY_BUCKETS
+)
+requests_total = Counter('http_requests_total', 'HTTP requests by route and status')
+db_queries_per_request = Histogram(
+    'db_queries_per_request', 'Database queries issued per HTTP request', QUERY_COUNT_BUCKETS
+)
+db_query_seconds = Counter('db_query_seconds_total', 'Time spent in database queries by route')
+
+_metrics = [request_duration, requests_total, db_queries_per_request, db_query_seconds]
+_collectors: Dict[str, Callable[[], dict]] = {}
+
+
+def register_collector(prefix: str, collect: Callable[[], dict]) -> None:
+    """Expose the numeric values of ``collect()`` as ``<prefix>_<key>`` gauges"""
+
+    _collectors[prefix] = collect
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for prefix, collect in _collectors.items():
+        for key, value in collect().items():
+            if isinstance(value, (int, float)):
+                lines.append(f'# TYPE {prefix}_{key} gauge')
+                lines.append(f'{prefix}_{key} {float(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+class RequestStats:
+    """Database work done on behalf of the current request"""
+
+    __slots__ = ('queries', 'db_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+current_request_stats: ContextVar[RequestStats | None] = ContextVar(
+    'current_request_stats', default=None
+)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Count queries and their duration against the current request"""
+
+    @event.listens_for(engine.sync_engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and database work per route"""
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Dict[Callable, str] | None = None
+
+    def _route_path(self, scope) -> str:
+        if self._route_paths is None:
+            self._route_paths = {
+                route.endpoint: route.path
+                for route in scope['app'].routes if hasattr(route, 'endpoint')
+            }
+        return self._route_paths.get(scope.get('endpoint'), '<unmatched>')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request_stats.reset(token)
+            route = (('method', scope['method']), ('route', self._route_path(scope)))
+            request_duration.observe(route, elapsed)
+            requests_total.inc(route + (('status', str(status_code)),))
+            db_queries_per_request.observe(route, stats.queries)
+            db_query_seconds.inc(route, stats.db_seconds)
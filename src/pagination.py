@@ -0,0 +1,39 @@
+import base64
+from datetime import datetime
+from typing import Tuple
+
+from fastapi import HTTPException
+
+
+def encode_cursor(created: datetime, row_id: int) -> str:
+    """Opaque keyset cursor pointing just after the row (created, id)"""
+
+    raw = f'{created.isoformat()}|{row_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str | None) -> Tuple[datetime, int] | None:
+    if cursor is None:
+        return
+    try:
+        created, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=422, detail='Invalid cursor')
+
+
+def encode_rank_cursor(rank: float, row_id: int) -> str:
+    """Opaque keyset cursor pointing just after the search hit (rank, id)"""
+
+    raw = f'{rank!r}|{row_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_rank_cursor(cursor: str | None) -> Tuple[float, int] | None:
+    if cursor is None:
+        return
+    try:
+        rank, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return float(rank), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=422, detail='Invalid cursor')
@@ -0,0 +1,48 @@
+from contextvars import ContextVar
+from functools import wraps
+from logging import getLogger
+
+import settings
+from metrics import current_request_stats
+
+logger = getLogger(__name__)
+
+# set while the outermost budgeted handler runs, so handlers called directly
+# from another handler do not check the whole request against their own budget
+_budget_active: ContextVar[bool] = ContextVar('query_budget_active', default=False)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def query_budget(max_queries: int):
+    """Check that a request served by the decorated handler, dependencies
+    included, issues at most ``max_queries`` queries.
+
+    QUERY_BUDGET_MODE selects what happens on overrun: 'raise' fails the
+    request, 'log' logs a warning and 'off' skips the check.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if settings.QUERY_BUDGET_MODE == 'off' or _budget_active.get():
+                return await func(*args, **kwargs)
+            token = _budget_active.set(True)
+            try:
+                result = await func(*args, **kwargs)
+            finally:
+                _budget_active.reset(token)
+            stats = current_request_stats.get()
+            if stats is not None and stats.queries > max_queries:
+                message = (
+                    f'{func.__name__} issued {stats.queries} queries, '
+                    f'budget is {max_queries}'
+                )
+                if settings.QUERY_BUDGET_MODE == 'raise':
+                    raise QueryBudgetExceeded(message)
+                logger.warning(message)
+            return result
+        return wrapper
+    return decorator
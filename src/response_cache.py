@@ -0,0 +1,59 @@
+import time
+
+import settings
+from cache import CacheBackend, MemoryCacheBackend
+
+# Serialized GET /post and GET /users payloads. A post payload embeds its
+# owner and the owner's posts, so every entry is tagged with the owner and
+# any write to the owner or their posts drops all of them at once.
+response_cache: CacheBackend = MemoryCacheBackend(
+    maxsize=settings.RESPONSE_CACHE_SIZE,
+    ttl=settings.RESPONSE_CACHE_TTL,
+    max_bytes=settings.RESPONSE_CACHE_MAX_BYTES
+)
+
+# bumped on every invalidation so that a read that raced with a write does
+# not put its stale payload back into the cache
+_invalidations = 0
+_invalidated_at = float('-inf')
+
+
+def post_key(post_id: int) -> str:
+    return f'post:{post_id}'
+
+
+def user_key(user_id: int) -> str:
+    return f'user:{user_id}'
+
+
+def owner_tag(user_id: int) -> str:
+    return f'owner:{user_id}'
+
+
+def pack(etag: str, payload: bytes) -> bytes:
+    return etag.encode() + b' ' + payload
+
+
+def unpack(entry: bytes) -> tuple:
+    """Split a stored entry back into (etag, payload)"""
+
+    etag, payload = entry.split(b' ', 1)
+    return etag.decode(), payload
+
+
+def fill_token() -> int:
+    return _invalidations
+
+
+async def store(key: str, payload: bytes, owner_id: int, token: int,
+                replica_lag: float = 0.0) -> None:
+    # a lagging replica may still return what the last write replaced
+    if token == _invalidations and time.monotonic() - _invalidated_at >= replica_lag:
+        await response_cache.set(key, payload, tags=(owner_tag(owner_id),))
+
+
+async def invalidate_owner(user_id: int) -> None:
+    global _invalidations, _invalidated_at
+    _invalidations += 1
+    _invalidated_at = time.monotonic()
+    await response_cache.invalidate_tag(owner_tag(user_id))
@@ -0,0 +1,111 @@
+import asyncio
+import contextvars
+import inspect
+from functools import wraps
+from typing import Awaitable, Callable, Dict, Hashable, Tuple
+
+import settings
+from db.session import read_only_engine, read_only_session
+from metrics import RequestStats, current_request_stats
+from response_cache import fill_token
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; callers arriving while it
+    is in flight await the same result instead of starting their own"""
+
+    def __init__(self):
+        self.leaders = 0
+        self.followers = 0
+        self._flights: Dict[Hashable, Tuple[asyncio.Future, RequestStats]] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable]):
+        entry = self._flights.get(key)
+        if entry is None:
+            self.leaders += 1
+            # the call outlives any one caller, so it counts its queries apart
+            # and every caller it served is charged with them
+            context = contextvars.copy_context()
+            context.run(current_request_stats.set, RequestStats())
+            flight = context.run(asyncio.ensure_future, call())
+            entry = self._flights[key] = flight, context[current_request_stats]
+            flight.add_done_callback(lambda done: self._land(key, done))
+        else:
+            self.followers += 1
+        flight, stats = entry
+        try:
+            # a cancelled caller must not cancel the call the others wait on
+            return await asyncio.shield(flight)
+        finally:
+            caller_stats = current_request_stats.get()
+            if caller_stats is not None and flight.done():
+                caller_stats.queries += stats.queries
+                caller_stats.db_seconds += stats.db_seconds
+
+    def _land(self, key: Hashable, flight: asyncio.Future) -> None:
+        entry = self._flights.get(key)
+        if entry is not None and entry[0] is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            # mark the exception retrieved when every caller went away
+            flight.exception()
+
+    def stats(self) -> dict:
+        calls = self.leaders + self.followers
+        return {
+            'in_flight': len(self._flights),
+            'leaders': self.leaders,
+            'followers': self.followers,
+            'shared_ratio': self.followers / calls if calls else 0.0
+        }
+
+
+single_flight = SingleFlight()
+
+
+def coalesce(func):
+    """Share one in-flight call of a read helper between concurrent callers
+    with equal arguments.
+
+    The ``db`` argument is left out of the key; the shared call runs on a
+    short-lived read-only session of its own, so it outlives any caller.
+    Only read-only requests take part, a request that writes keeps reading
+    its own writes. Keys include the response cache invalidation counter:
+    a call started before a write commits is never joined by a request
+    that arrives after. A caller gives its connection back to the pool
+    before it waits, its next query begins a new read-only transaction.
+    """
+
+    signature = inspect.signature(func)
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        if not settings.SINGLE_FLIGHT:
+            return await func(*args, **kwargs)
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        db = bound.arguments['db']
+        if db.bind is not read_only_engine:
+            return await func(*args, **kwargs)
+        # clients pinned to the primary after a write share only with each other
+        use_replica = db.info.get('replica') is not None
+        arguments = tuple(
+            (name, value) for name, value in bound.arguments.items() if name != 'db'
+        )
+        key = (func.__qualname__, fill_token(), use_replica, arguments)
+        try:
+            hash(key)
+        except TypeError:
+            return await func(*args, **kwargs)
+
+        async def call():
+            async with read_only_session(use_replica) as session:
+                bound.arguments['db'] = session
+                return await func(*bound.args, **bound.kwargs)
+
+        # the shared call checks out a connection of its own; callers that
+        # held theirs meanwhile could drain the pool and wait on each other
+        if db.in_transaction():
+            await db.close()
+        return await single_flight.do(key, call)
+    return wrapper
@@ -0,0 +1,77 @@
+import asyncio
+
+from cache import MemoryCacheBackend
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_get_returns_what_was_set():
+    cache = MemoryCacheBackend(maxsize=10, ttl=60, max_bytes=100)
+    run(cache.set('a', b'value'))
+    assert run(cache.get('a')) == b'value'
+    assert run(cache.get('b')) is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_expired_entry_is_a_miss():
+    cache = MemoryCacheBackend(maxsize=10, ttl=-1, max_bytes=100)
+    run(cache.set('a', b'value'))
+    assert run(cache.get('a')) is None
+    assert cache.bytes == 0
+
+
+def test_byte_bound_evicts_least_recently_used():
+    cache = MemoryCacheBackend(maxsize=10, ttl=60, max_bytes=10)
+    run(cache.set('a', b'aaaa'))
+    run(cache.set('b', b'bbbb'))
+    run(cache.get('a'))
+    run(cache.set('c', b'cccc'))
+    assert run(cache.get('b')) is None
+    assert run(cache.get('a')) == b'aaaa'
+    assert cache.bytes == 8
+
+
+def test_entry_bound_evicts_least_recently_used():
+    cache = MemoryCacheBackend(maxsize=2, ttl=60, max_bytes=100)
+    for key in ('a', 'b', 'c'):
+        run(cache.set(key, b'x'))
+    assert run(cache.get('a')) is None
+    assert cache.stats()['size'] == 2
+
+
+def test_value_over_the_byte_bound_is_not_stored():
+    cache = MemoryCacheBackend(maxsize=10, ttl=60, max_bytes=4)
+    run(cache.set('a', b'aa'))
+    run(cache.set('b', b'bbbbb'))
+    assert run(cache.get('b')) is None
+    assert run(cache.get('a')) == b'aa'
+
+
+def test_overwrite_replaces_bytes_and_tags():
+    cache = MemoryCacheBackend(maxsize=10, ttl=60, max_bytes=100)
+    run(cache.set('a', b'long value', tags=['old']))
+    run(cache.set('a', b'short', tags=['new']))
+    assert cache.bytes == 5
+    run(cache.invalidate_tag('old'))
+    assert run(cache.get('a')) == b'short'
+    run(cache.invalidate_tag('new'))
+    assert run(cache.get('a')) is None
+
+
+def test_invalidate_tag_drops_only_tagged_keys():
+    cache = MemoryCacheBackend(maxsize=10, ttl=60, max_bytes=100)
+    run(cache.set('post:1', b'1', tags=['owner:1']))
+    run(cache.set('post:2', b'2', tags=['owner:1', 'owner:2']))
+    run(cache.set('post:3', b'3', tags=['owner:2']))
+    run(cache.invalidate_tag('owner:1'))
+    assert run(cache.get('post:1')) is None
+    assert run(cache.get('post:2')) is None
+    assert run(cache.get('post:3')) == b'3'
+    assert cache.bytes == 1
+    # the removed keys left no trace under their other tags
+    run(cache.invalidate_tag('owner:2'))
+    assert cache.bytes == 0
+    assert cache._tags == {}
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+from api.actions.posts.models import ShowPostID
+from feed import FeedBuffer
+
+START = datetime(2023, 1, 1)
+
+
+def post(post_id: int) -> ShowPostID:
+    return ShowPostID(
+        post_id=post_id, title=f'Post {post_id}', body='body',
+        created=START + timedelta(minutes=post_id), owner_id=1
+    )
+
+
+def ids(posts) -> list:
+    return [post.post_id for post in posts]
+
+
+def test_hydrate_keeps_the_newest_posts():
+    feed = FeedBuffer(size=3, max_age=0)
+    assert feed.hydrate([post(post_id) for post_id in range(1, 6)])
+    assert not feed.exhaustive
+    assert ids(feed.page(limit=2)) == [5, 4, 3]
+
+
+def test_short_table_is_exhaustive():
+    feed = FeedBuffer(size=3, max_age=0)
+    feed.hydrate([post(1), post(2)])
+    assert feed.exhaustive
+    assert ids(feed.page(limit=5)) == [2, 1]
+    assert ids(feed.page(limit=5, after=(post(2).created, 2))) == [1]
+
+
+def test_page_past_the_prefix_falls_back():
+    feed = FeedBuffer(size=3, max_age=0)
+    feed.hydrate([post(post_id) for post_id in range(1, 6)])
+    assert feed.page(limit=3) is None
+    assert feed.page(limit=1, after=(post(4).created, 4)) is None
+    assert feed.stats()['fallbacks'] == 2
+
+
+def test_unhydrated_buffer_is_not_served():
+    feed = FeedBuffer(size=3, max_age=0)
+    feed.add(post(1))
+    assert feed.page(limit=1) is None
+
+
+def test_new_post_evicts_the_tail():
+    feed = FeedBuffer(size=3, max_age=0)
+    feed.hydrate([post(1), post(2)])
+    feed.add(post(4))
+    feed.add(post(3))
+    assert ids(feed.page(limit=2)) == [4, 3, 2]
+    assert not feed.exhaustive
+
+
+def test_post_older_than_the_prefix_is_not_added():
+    feed = FeedBuffer(size=3, max_age=0)
+    feed.hydrate([post(post_id) for post_id in range(3, 8)])
+    feed.discard(7)
+    feed.add(post(1))
+    # the buffer still holds a prefix of the feed: 6, 5 and nothing older
+    assert ids(feed.page(limit=1)) == [6, 5]
+    assert feed.page(limit=2) is None
+
+
+def test_update_and_discard():
+    feed = FeedBuffer(size=3, max_age=0)
+    feed.hydrate([post(1), post(2)])
+    feed.update(2, title='edited')
+    feed.discard(1)
+    page = feed.page(limit=5)
+    assert ids(page) == [2]
+    assert page[0].title == 'edited'
+
+
+def test_hydrate_with_stale_write_token_is_refused():
+    feed = FeedBuffer(size=3, max_age=0)
+    feed.hydrate([post(1)])
+    token = feed.write_token()
+    feed.add(post(2))
+    assert not feed.hydrate([post(1)], token)
+    assert ids(feed.page(limit=5)) == [2, 1]
+    assert feed.hydrate([post(1), post(2)], feed.write_token())
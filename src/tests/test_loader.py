@@ -0,0 +1,102 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from db.loader import Loader
+from db.models import Post
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return iter(self.rows)
+
+
+class FakeSession:
+    """Answers ``WHERE id IN (...)`` with a row for every existing id"""
+
+    def __init__(self, existing=(), error: Exception | None = None):
+        self.existing = set(existing)
+        self.error = error
+        self.batches = []
+
+    async def execute(self, query):
+        keys = list(query.compile().params.values())[0]
+        self.batches.append(sorted(keys))
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        return FakeResult([SimpleNamespace(id=key) for key in keys if key in self.existing])
+
+
+def test_loads_of_one_tick_share_one_query():
+    session = FakeSession(existing={1, 2})
+
+    async def run():
+        loader = Loader(session, Post)
+        return await loader.load_many([1, 2, 2, 3])
+
+    rows = asyncio.run(run())
+    assert [row.id if row is not None else None for row in rows] == [1, 2, 2, None]
+    assert session.batches == [[1, 2, 3]]
+
+
+def test_loaded_ids_are_not_fetched_again():
+    session = FakeSession(existing={1, 2})
+
+    async def run():
+        loader = Loader(session, Post)
+        await loader.load(1)
+        await loader.load_many([1, 2])
+        return loader.batches
+
+    assert asyncio.run(run()) == 2
+    assert session.batches == [[1], [2]]
+
+
+def test_clear_forgets_loaded_ids():
+    session = FakeSession(existing={1})
+
+    async def run():
+        loader = Loader(session, Post)
+        await loader.load(1)
+        loader.clear()
+        await loader.load(1)
+
+    asyncio.run(run())
+    assert session.batches == [[1], [1]]
+
+
+def test_failed_fetch_fails_every_caller_and_is_retried():
+    session = FakeSession(existing={1, 2}, error=RuntimeError('connection lost'))
+
+    async def run():
+        loader = Loader(session, Post)
+        results = await asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+        session.error = None
+        return results, await loader.load(1)
+
+    results, retried = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert retried.id == 1
+    assert session.batches == [[1, 2], [1]]
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    session = FakeSession(existing={1})
+
+    async def run():
+        loader = Loader(session, Post)
+        first = asyncio.ensure_future(loader.load(1))
+        second = asyncio.ensure_future(loader.load(1))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()).id == 1
+    assert session.batches == [[1]]
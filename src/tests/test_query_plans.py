@@ -0,0 +1,161 @@
+"""Fail when a DAL read method's query plan sequentially scans a big table.
+
+Every read method runs once against a seeded database while its SQL is
+captured, then each statement is EXPLAINed with the same parameters.
+A plan fails if it sequentially scans a table that holds more than
+EXPLAIN_MIN_ROWS rows. Point TEST_DATABASE_URL at a database seeded with
+``python -m benchmarks.seed``; without it the tests are skipped::
+
+    TEST_DATABASE_URL=postgresql+asyncpg://... python -m pytest tests/test_query_plans.py
+"""
+import asyncio
+import json
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from db.dal import CommentsDAL, PostDAL, UserDAL
+from db.models import Comment, Post, User
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+MIN_ROWS = int(os.getenv('EXPLAIN_MIN_ROWS', default=10000))
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason='TEST_DATABASE_URL is not set'
+)
+
+# name -> DAL call; ``ids`` holds an existing user, post and comment
+CHECKS = {
+    'UserDAL.get_user_by_id':
+        lambda s, ids: UserDAL(s).get_user_by_id(ids['user_id']),
+    'UserDAL.get_users_by_ids':
+        lambda s, ids: UserDAL(s).get_users_by_ids([ids['user_id'], ids['user_id'] + 1]),
+    'UserDAL.get_user_by_email':
+        lambda s, ids: UserDAL(s).get_user_by_email(ids['email']),
+    'UserDAL.get_user_version':
+        lambda s, ids: UserDAL(s).get_user_version(ids['user_id']),
+    'UserDAL.get_all_post_by_user_id':
+        lambda s, ids: UserDAL(s).get_all_post_by_user_id(ids['user_id']),
+    'UserDAL.get_posts_page_by_user_id':
+        lambda s, ids: UserDAL(s).get_posts_page_by_user_id(
+            ids['user_id'], limit=20, after=(datetime.utcnow(), ids['post_id'])
+        ),
+    'PostDAL.get_post_by_id':
+        lambda s, ids: PostDAL(s).get_post_by_id(ids['post_id']),
+    'PostDAL.get_posts_by_ids':
+        lambda s, ids: PostDAL(s).get_posts_by_ids([ids['post_id'], ids['post_id'] + 1]),
+    'PostDAL.get_owner_id':
+        lambda s, ids: PostDAL(s).get_owner_id(ids['post_id']),
+    'PostDAL.get_post_versions':
+        lambda s, ids: PostDAL(s).get_post_versions(ids['post_id']),
+    'PostDAL.get_latest_posts':
+        lambda s, ids: PostDAL(s).get_latest_posts(
+            limit=20, after=(datetime.utcnow(), ids['post_id'])
+        ),
+    'PostDAL.search':
+        # seeded titles are 'Post <id>', a post id matches a handful of posts
+        lambda s, ids: PostDAL(s).search(str(ids['post_id']), limit=20, headline_options=''),
+    'PostDAL.get_post_with_owner':
+        lambda s, ids: PostDAL(s).get_post_with_owner(ids['post_id']),
+    'CommentsDAL.get_comment_by_id':
+        lambda s, ids: CommentsDAL(s).get_comment_by_id(ids['comment_id']),
+    'CommentsDAL.get_post_id_by_comment':
+        lambda s, ids: CommentsDAL(s).get_post_id_by_comment(ids['comment_id']),
+    'CommentsDAL.get_comment_with_post_and_author':
+        lambda s, ids: CommentsDAL(s).get_comment_with_post_and_author(ids['comment_id']),
+    'CommentsDAL.get_comments_page_by_post_id':
+        lambda s, ids: CommentsDAL(s).get_comments_page_by_post_id(
+            ids['post_id'], limit=20, after=(datetime(1970, 1, 1), 0)
+        ),
+}
+
+
+def seq_scans(plan: dict) -> list:
+    """Relations scanned sequentially anywhere in the plan tree"""
+
+    relations = []
+    if plan.get('Node Type') == 'Seq Scan':
+        relations.append(plan['Relation Name'])
+    for child in plan.get('Plans', []):
+        relations.extend(seq_scans(child))
+    return relations
+
+
+async def sample_ids(session) -> dict:
+    comment = (await session.execute(
+        select(Comment.id, Comment.post_id, Comment.user_id).limit(1)
+    )).one()
+    email = (await session.execute(
+        select(User.email).where(User.id == comment.user_id)
+    )).scalar_one()
+    return {
+        'user_id': comment.user_id,
+        'email': email,
+        'post_id': comment.post_id,
+        'comment_id': comment.id
+    }
+
+
+async def table_sizes(session) -> dict:
+    sizes = {}
+    for model in (User, Post, Comment):
+        table = model.__tablename__
+        sizes[table] = (await session.execute(
+            text('SELECT reltuples::bigint FROM pg_class WHERE relname = :table'),
+            {'table': table}
+        )).scalar_one()
+    return sizes
+
+
+async def explain(session_factory, engine, check, ids: dict) -> list:
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    async with session_factory() as session:
+        async with session.begin():
+            event.listen(engine.sync_engine, 'before_cursor_execute', capture)
+            try:
+                await check(session, ids)
+            finally:
+                event.remove(engine.sync_engine, 'before_cursor_execute', capture)
+            plans = []
+            connection = await session.connection()
+            for statement, parameters in captured:
+                result = await connection.exec_driver_sql(
+                    f'EXPLAIN (FORMAT JSON) {statement}', parameters
+                )
+                plan = result.scalar_one()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                plans.append(plan[0]['Plan'])
+            return plans
+
+
+async def scanned_tables(check) -> set:
+    """Big tables that the check's plans scan sequentially"""
+
+    engine = create_async_engine(TEST_DATABASE_URL)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    try:
+        async with session_factory() as session:
+            ids = await sample_ids(session)
+            sizes = await table_sizes(session)
+        return {
+            relation
+            for plan in await explain(session_factory, engine, check, ids)
+            for relation in seq_scans(plan)
+            if sizes.get(relation, 0) > MIN_ROWS
+        }
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.parametrize('name', list(CHECKS))
+def test_no_sequential_scan(name):
+    scanned = asyncio.run(scanned_tables(CHECKS[name]))
+    assert not scanned, f'{name}: seq scan on {", ".join(sorted(scanned))}'
@@ -0,0 +1,67 @@
+"""Run real queries through the application's session factories.
+
+Needs a Postgres database at TEST_DATABASE_URL, skipped without it::
+
+    TEST_DATABASE_URL=postgresql+asyncpg://... python -m pytest tests/test_session.py
+"""
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import db.session
+from db.models import User
+from db.session import async_session, read_only_session
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason='TEST_DATABASE_URL is not set'
+)
+
+
+@pytest.fixture
+def test_engine(monkeypatch):
+    engine = create_async_engine(TEST_DATABASE_URL)
+    monkeypatch.setattr(
+        db.session, 'read_only_engine', engine.execution_options(postgresql_readonly=True)
+    )
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+def test_async_session_runs_orm_query(test_engine):
+    async def run():
+        async with async_session(bind=test_engine) as session:
+            await session.execute(select(User.id).limit(1))
+            return (await session.execute(text('SHOW transaction_read_only'))).scalar_one()
+
+    assert asyncio.run(run()) == 'off'
+
+
+def test_read_only_session_runs_read_only_transaction(test_engine):
+    async def run():
+        async with read_only_session() as session:
+            await session.execute(select(User.id).limit(1))
+            return (await session.execute(text('SHOW transaction_read_only'))).scalar_one()
+
+    assert asyncio.run(run()) == 'on'
+
+
+def test_replica_session_routes_and_unpins_on_write(test_engine):
+    replica = test_engine.execution_options(postgresql_readonly=True)
+
+    async def run():
+        async with async_session(bind=test_engine) as session:
+            session.info['replica'] = replica
+            read_only = (await session.execute(text('SHOW transaction_read_only'))).scalar_one()
+            await session.execute(select(User.id).limit(1))
+            # an ORM write unpins the replica for the rest of the session
+            await session.execute(
+                User.__table__.update().where(User.id == -1).values(name='x')
+            )
+            return read_only, 'replica' in session.info
+
+    assert asyncio.run(run()) == ('on', False)
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from metrics import RequestStats, current_request_stats
+from single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'result'
+
+    async def run():
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.do('key', call) for _ in range(3)))
+        return flights, results
+
+    flights, results = asyncio.run(run())
+    assert results == ['result'] * 3
+    assert len(calls) == 1
+    assert flights.stats() == {
+        'in_flight': 0, 'leaders': 1, 'followers': 2, 'shared_ratio': 2 / 3
+    }
+
+
+def test_different_keys_do_not_share():
+    async def run():
+        flights = SingleFlight()
+        return await asyncio.gather(
+            flights.do('a', lambda: asyncio.sleep(0, result='a')),
+            flights.do('b', lambda: asyncio.sleep(0, result='b'))
+        )
+
+    assert asyncio.run(run()) == ['a', 'b']
+
+
+def test_error_reaches_every_caller_and_is_not_kept():
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError('boom')
+
+    async def run():
+        flights = SingleFlight()
+        results = await asyncio.gather(
+            flights.do('key', failing), flights.do('key', failing), return_exceptions=True
+        )
+        return results, await flights.do('key', lambda: asyncio.sleep(0, result='again'))
+
+    results, again = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert again == 'again'
+
+
+def test_cancelled_caller_does_not_cancel_the_call():
+    async def call():
+        await asyncio.sleep(0.01)
+        return 'result'
+
+    async def run():
+        flights = SingleFlight()
+        leader = asyncio.ensure_future(flights.do('key', call))
+        follower = asyncio.ensure_future(flights.do('key', call))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == 'result'
+
+
+def test_every_caller_is_charged_with_the_shared_queries():
+    async def call():
+        await asyncio.sleep(0.01)
+        current_request_stats.get().queries += 2
+        return 'result'
+
+    async def request(flights):
+        stats = RequestStats()
+        current_request_stats.set(stats)
+        await flights.do('key', call)
+        return stats.queries
+
+    async def run():
+        flights = SingleFlight()
+        return await asyncio.gather(request(flights), request(flights))
+
+    assert asyncio.run(run()) == [2, 2]